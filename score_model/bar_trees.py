@@ -1,8 +1,10 @@
-from .music_sequences import Event, Timeline
+from .music_sequences import Event, Timeline, _lcm
 from .constant import REST_SYMBOL, CONTINUATION_SYMBOL
 
 from fractions import Fraction
 from pathlib import Path
+import hashlib
+import copy
 import numpy as np
 from graphviz import Digraph
 
@@ -10,6 +12,19 @@ from graphviz import Digraph
 class Node:
     """The generic Tree node class."""
 
+    # no __dict__, nodes are created in large numbers (e.g. for each candidate subtree in timeline2rt)
+    __slots__ = (
+        "_digest",
+        "_clean",
+        "_interned",
+        "type",
+        "children",
+        "parent",
+        "_label",
+        "duration",
+        "__weakref__",  # interned nodes can be stored in a weakref.WeakValueDictionary
+    )
+
     def __init__(self, parent, type, label=None):
         """Initialize a node.
 
@@ -20,6 +35,9 @@ class Node:
             type (string): a string that can be "root", "internal", "leaf"
             label ([object], optional): Some information contained in the node. Defaults to None.
         """
+        self._digest = None  # the cached structural hash
+        self._clean = None  # the token of the tree whose caches are valid, see Tree._check_caches()
+        self._interned = False  # interned nodes can be shared by multiple trees
         self.type = type
         self.children = []  # each child is a Node
         self.parent = parent
@@ -31,9 +49,73 @@ class Node:
                 self
             )  # add a child in the parent Node if the parent is not the root
 
+    def __getstate__(self):  # needed by the pickle protocols 0 and 1 with __slots__
+        state = {name: getattr(self, name) for name in Node.__slots__[:-1]}
+        state["_clean"] = None  # the caches of the trees are not pickled
+        return state
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+
     def add_child(self, child):
         """Add a children to the node. Not really useful in standard utilisation, as a new node is added to the children list when it is created."""
+        self._check_not_interned()
         self.children.append(child)
+        self._invalidate_caches()
+
+    @property
+    def label(self):
+        return self._label
+
+    @label.setter
+    def label(self, label):
+        self._check_not_interned()
+        self._label = label
+        self._invalidate_caches()
+
+    def _check_not_interned(self):
+        """Raise an exception if the node is shared between multiple trees."""
+        if self._interned:
+            raise TypeError(
+                "Interned nodes are shared between trees and cannot be modified"
+            )
+
+    def _invalidate_caches(self):
+        """Delete the cached structural hash of the node and of its ancestors, and mark them as modified.
+
+        If a node is already invalidated, so are its ancestors, so the walk stops there
+        and building a tree node by node stays linear.
+        """
+        node = self
+        while node is not None and (node._digest is not None or node._clean is not None):
+            node._digest = None
+            node._clean = None
+            node = node.parent
+
+    def structural_hash(self):
+        """Return a hash of the subtree under the node, computed from the node type, the label and the children hashes.
+
+        It is cached, and invalidated when a child is added with add_child() or when a label is changed.
+        WARNING: the cache is not invalidated if the children list is modified directly.
+
+        Returns:
+            bytes: a 16 bytes digest
+        """
+        # post-order visit with an explicit stack, so deep trees do not hit the recursion limit
+        to_visit = [(self, False)]
+        while len(to_visit) > 0:
+            node, children_hashed = to_visit.pop()
+            if node._digest is not None:  # cached, or a shared child already visited
+                continue
+            if children_hashed:
+                node._digest = _structural_digest(
+                    node.type, node.label, [c._digest for c in node.children]
+                )
+            else:
+                to_visit.append((node, True))
+                to_visit.extend((c, False) for c in node.children)
+        return self._digest
 
     def __str__(self):
         return self.to_string()
@@ -86,12 +168,62 @@ class Node:
             return all([c.complete() for c in self.children])
 
     def __eq__(self, other):
-        return self.to_string() == other.to_string()
+        if not isinstance(other, Node):
+            return NotImplemented
+        return self.structural_hash() == other.structural_hash()
+
+    def __hash__(self):
+        return int.from_bytes(self.structural_hash()[:8], "little")
+
+
+def _structural_digest(type, label, children_digests):
+    """Compute the structural hash of a node from its type, its label and the hashes of its children."""
+    h = hashlib.blake2b(digest_size=16)
+    label = str(label).encode()
+    h.update(type.encode())
+    h.update(len(label).to_bytes(8, "little"))
+    h.update(label)
+    h.update(len(children_digests).to_bytes(8, "little"))
+    for digest in children_digests:
+        h.update(digest)
+    return h.digest()
+
+
+def _has_interned_nodes(local_root):
+    """Return True if the subtree under local_root contains interned nodes."""
+    to_visit = [local_root]
+    while len(to_visit) > 0:
+        node = to_visit.pop()
+        if node._interned:
+            return True
+        to_visit.extend(node.children)
+    return False
+
+
+def _copy_subtree(local_root, parent):
+    """Create a copy of the subtree under local_root, attached to parent."""
+    new_local_root = None
+    to_visit = [(local_root, parent)]  # explicit stack, so deep trees do not hit the recursion limit
+    while len(to_visit) > 0:
+        node, parent = to_visit.pop()
+        if node.type == "root":
+            new_node = Root()
+        elif node.type == "leaf":
+            new_node = LeafNode(parent, copy.deepcopy(node.label))
+        else:
+            new_node = InternalNode(parent, copy.deepcopy(node.label))
+        if new_local_root is None:
+            new_local_root = new_node
+        # the children are visited in order, so they are added to new_node in order
+        to_visit.extend((c, new_node) for c in reversed(node.children))
+    return new_local_root
 
 
 class Root(Node):
     """The class for the Root node (e.g. without parent), extending Node."""
 
+    __slots__ = ()
+
     def __init__(self):
         Node.__init__(self, None, "root")
 
@@ -102,6 +234,8 @@ class Root(Node):
 class InternalNode(Node):
     """The class for the Internal node, extending Node."""
 
+    __slots__ = ()
+
     def __init__(self, parent, label):
         Node.__init__(self, parent, "internal", label)
 
@@ -109,6 +243,8 @@ class InternalNode(Node):
 class LeafNode(Node):
     """The class for the Leaf node, extending Node."""
 
+    __slots__ = ()
+
     def __init__(self, parent, label):
         Node.__init__(self, parent, "leaf", label)
 
@@ -128,18 +264,104 @@ class Tree:
     def __init__(self, root):
         self.root = root
 
-    def get_nodes(self, local_root=None):
-        """Return a list with all nodes in the tree."""
+    @property
+    def root(self):
+        """The root of the tree.
 
-        def _all_nodes(node, children_list):  # the recursive function
-            children_list.append(node)  # add the current node
-            for c in node.children:
-                _all_nodes(c, children_list)
-            return children_list
+        If the tree contains interned subtrees, they are replaced with private copies before returning the root
+        (see unshare()), so the nodes can be modified and each node has a single position in the tree.
+        """
+        if self._shared:
+            self.unshare()
+        return self._root
+
+    @root.setter
+    def root(self, root):
+        self._root = root
+        self._shared = _has_interned_nodes(root)
+        self._cache_token = None
+        self._clear_caches()
+
+    def __getstate__(self):
+        # the lca index and the leaves counts are indexed by id of the nodes, so they are not valid in another process
+        state = self.__dict__.copy()
+        state["_cache_token"] = None
+        state["_lca_index"] = None
+        state["_leaves_counts"] = None
+        return state
+
+    def _clear_caches(self):
+        """Delete the caches of the tree, that are indexed by node id."""
+        self._lca_index = None
+        self._leaves_counts = None
+
+    def _check_caches(self):
+        """Delete the caches of the tree if a node has been added or modified since they were computed.
+
+        When the caches are computed all nodes are marked with a token of the tree, and a modification
+        of a node removes the token from the node and its ancestors (see Node._invalidate_caches()),
+        so the caches are valid only if the root still has the token.
+        WARNING: modifications of the children lists that do not use add_child() are not detected.
+        """
+        if self._cache_token is None or self._root._clean is not self._cache_token:
+            self._clear_caches()
+            self._cache_token = object()
+            for node in self.get_nodes(local_root=self._root):
+                node._clean = self._cache_token
+
+    def unshare(self):
+        """Replace all the nodes of the tree with private copies.
+
+        Trees generated with an intern_table share their identical subtrees, that cannot be modified
+        and have no parent, because they can appear in more positions of the tree.
+        This function is called automatically the first time the nodes of the tree are accessed (e.g. with root,
+        get_nodes(), get_lca_index()), while the functions that only read the tree (e.g. ==, hash(), str(),
+        get_leaves_ticks(), get_timeline()) keep the subtrees shared.
+        """
+        self.root = _copy_subtree(self._root, None)
+
+    def get_lca_index(self):
+        """Return an LCAIndex for depth and lca queries in constant time.
+
+        It is built at the first call, and built again if the tree has been modified.
+        """
+        if self._shared:  # the index is by node, so each node must have a single position
+            self.unshare()
+        self._check_caches()
+        if self._lca_index is None:
+            self._lca_index = LCAIndex(self)
+        return self._lca_index
+
+    def get_leaves_counts(self):
+        """Return a dictionary with the number of leaves in the subtree of each node, indexed by node id.
+
+        It is computed in O(n) at the first call, and computed again if the tree has been modified.
+        """
+        if self._shared:  # the counts are by node, so each node must have a single position
+            self.unshare()
+        self._check_caches()
+        if self._leaves_counts is None:
+            counts = {}
+            # the nodes in reverse depth-first order, so the children come before their parent
+            for node in reversed(self.get_nodes()):
+                if node.type == "leaf":
+                    counts[id(node)] = 1
+                else:
+                    counts[id(node)] = sum([counts[id(c)] for c in node.children])
+            self._leaves_counts = counts
+        return self._leaves_counts
 
+    def get_nodes(self, local_root=None):
+        """Return a list with all nodes in the tree, in depth-first order."""
         if local_root is None:
             local_root = self.root
-        return _all_nodes(local_root, [])
+        nodes = []
+        to_visit = [local_root]  # explicit stack, so deep trees do not hit the recursion limit
+        while len(to_visit) > 0:
+            node = to_visit.pop()
+            nodes.append(node)
+            to_visit.extend(reversed(node.children))
+        return nodes
 
     def get_leaf_nodes(self, local_root=None):
         """Return a list with all Leaf Nodes in the tree."""
@@ -151,35 +373,30 @@ class Tree:
 
     def get_depth(self, node):
         """Return the depth of a node in the tree."""
-        if node.type == "root":
-            return 0
-        else:  # iterative call
-            if not isinstance(node.parent, Node):  # and structure check
-                raise Exception("The parent of node", self, "has to be a Node")
-            else:
-                return 1 + self.get_depth(node.parent)
+        return len(self._get_ancestors(node)) - 1
 
     def get_ancestors(self, node):
         """Get a list of all the ancestors in the tree of a node."""
         return self._get_ancestors(node)[1:]  # remove the node itself
 
     def _get_ancestors(self, node):
-        """Recursive function called by get_ancestors."""
-        if node.type == "root":
-            return [node]
-        else:  # recursive call
-            if not isinstance(node.parent, Node):  # and structure check
+        """Return a list with the node and all its ancestors, walking up the parents until the root."""
+        out = [node]
+        while node.type != "root":
+            if not isinstance(node.parent, Node):  # structure check
                 raise Exception("The parent of node", self, "has to be a Node")
-            else:
-                out = [node]
-                out.extend(self._get_ancestors(node.parent))
-                return out
+            node = node.parent
+            out.append(node)
+        return out
 
     def __eq__(self, other):
         if not isinstance(other, type(self)):
             return False
         else:
-            return str(self) == str(other)
+            return self._root == other._root
+
+    def __hash__(self):
+        return hash(self._root)
 
     def get_lca(self, node1, node2):
         """Get the lower common ancestor (lca) of two input nodes.
@@ -197,24 +414,20 @@ class Tree:
         if node1 is node2:
             raise Exception("The two inputs must be distinct nodes")
 
-        def _get_lca(anc_list, node):
-            if id(node) in [id(n) for n in anc_list]:
-                return node
-            else:
-                return _get_lca(anc_list, node.parent)
-
-        node1_anc = self.get_ancestors(node1)
-        node1_anc.append(node1)  # in node 1 is directly an ancestor of node2
-        return _get_lca(node1_anc, node2)
+        node1_anc = set(id(n) for n in self._get_ancestors(node1))  # node1 can be an ancestor of node2
+        node = node2
+        while id(node) not in node1_anc:
+            node = node.parent
+        return node
 
     def to_string(self):
-        return self.root.to_string()
+        return self._root.to_string()
 
     def __repr__(self):
-        return self.root.to_string()
+        return self._root.to_string()
 
     def __str__(self):
-        return self.root.to_string()
+        return self._root.to_string()
 
     # Comment to reduce the dependencies from graphviz
     def show(self, save=False, name="tree", simplify_label=lambda x: str(x)):
@@ -230,7 +443,7 @@ class Tree:
         """
         tree_repr = Digraph(comment="Tree")
         tree_repr.node("1", "")  # the root
-        self._recursive_tree_display(self.root, tree_repr, "11", simplify_label)
+        self._recursive_tree_display(self._root, tree_repr, "11", simplify_label)
         if save:
             tree_repr.render(str(Path("test-output", name)), view=True)
         return tree_repr
@@ -250,6 +463,84 @@ class Tree:
                 name = name[:-1] + str(int(name[-1]) + 1)
 
 
+class LCAIndex:
+    """An index on a tree that answers depth and lower common ancestor (lca) queries in constant time.
+
+    It is built from an Euler tour of the tree (the sequence of nodes visited by a depth-first traversal, 
+    with a node repeated each time the traversal comes back to it) and a sparse table 
+    with the position of the minimum depth in each interval of length 2^j of the tour.
+    The lca of two nodes is the node with minimum depth between their first occurrences in the tour.
+    """
+
+    def __init__(self, tree):
+        """Build the index in O(n log n).
+
+        Args:
+            tree (Tree): the tree to index
+        """
+        self._euler = []  # the nodes in the Euler tour
+        euler_depths = []
+        self._first = {}  # the first position in the tour of each node, indexed by node id
+        self._depth = {}  # the depth of each node, indexed by node id
+        stack = [(tree.root, 0, 0)]  # (node, depth, index of the next child to visit)
+        while len(stack) > 0:
+            node, depth, child_index = stack.pop()
+            if child_index == 0:  # first visit
+                self._first[id(node)] = len(self._euler)
+                self._depth[id(node)] = depth
+            self._euler.append(node)
+            euler_depths.append(depth)
+            if child_index < len(node.children):
+                stack.append((node, depth, child_index + 1))
+                stack.append((node.children[child_index], depth + 1, 0))
+        self._euler_depths = np.array(euler_depths)
+        # the sparse table, table[j][p] is the position of the min depth in the tour[p:p+2^j]
+        self._table = [np.arange(len(self._euler))]
+        j = 1
+        while 2 ** j <= len(self._euler):
+            previous = self._table[-1]
+            left = previous[: len(previous) - 2 ** (j - 1)]
+            right = previous[2 ** (j - 1) :]
+            self._table.append(
+                np.where(
+                    self._euler_depths[left] <= self._euler_depths[right], left, right
+                )
+            )
+            j += 1
+
+    def depth(self, node):
+        """Return the depth of a node in the tree."""
+        try:
+            return self._depth[id(node)]
+        except KeyError:
+            raise Exception("Input nodes should belong to the indexed tree")
+
+    def lca(self, node1, node2):
+        """Get the lower common ancestor (lca) of two input nodes.
+
+        Args:
+            node1 (Node): the first node to consider.
+            node2 (Node): the second node to consider.
+
+        Returns:
+            Node: the lca of the input nodes.
+        """
+        try:
+            left = self._first[id(node1)]
+            right = self._first[id(node2)]
+        except KeyError:
+            raise Exception("Input nodes should belong to the indexed tree")
+        if left > right:
+            left, right = right, left
+        j = (right - left + 1).bit_length() - 1
+        candidate1 = self._table[j][left]
+        candidate2 = self._table[j][right - 2 ** j + 1]
+        if self._euler_depths[candidate1] <= self._euler_depths[candidate2]:
+            return self._euler[candidate1]
+        else:
+            return self._euler[candidate2]
+
+
 class NotationTree(Tree):
     """The class for the Notation Tree.
 
@@ -277,15 +568,15 @@ class NotationTree(Tree):
         self.tree_type = tree_type
         if quality_check:
             # perform some quality check to verify that the set of nodes are valid
-            if not isinstance(self.root, Root):  # check if the root is a root node
+            if not isinstance(self._root, Root):  # check if the root is a root node
                 raise TypeError("Parameter root must be of type Root")
             # check if notes without childrens are leaves
-            for node in self.get_nodes():
+            for node in self.get_nodes(local_root=self._root):
                 if not node.has_children():
                     if not isinstance(node, LeafNode):
                         raise TypeError("There is an internal node without leaves")
             # check if leaves label is correctly formatted
-            for node in self.get_leaf_nodes():
+            for node in self.get_leaf_nodes(local_root=self._root):
                 if not isinstance(node.label, tuple):
                     raise TypeError("Leaf label" + str(node) + "should be a tuple")
                 if len(node.label) != 4:
@@ -334,17 +625,18 @@ class RhythmTree(Tree):
             TypeError: if the Node structure under "root" is not valid for a Rhythm Tree.
         """
         Tree.__init__(self, root)
+        self._ticks = None  # the cached leaves ticks
         if quality_check:
             # perform some quality check to verify that the set of nodes are valid
-            if not isinstance(self.root, Root):  # check if the root is a root node
+            if not isinstance(self._root, Root):  # check if the root is a root node
                 raise TypeError("Parameter root must be of type Root")
             # check if notes without childrens are leaves
-            for node in self.get_nodes():
+            for node in self.get_nodes(local_root=self._root):
                 if not node.has_children():
                     if not isinstance(node, LeafNode):
                         raise TypeError("There is an internal node without leaves")
             # check if leaves label is correctly formatted
-            for node in self.get_leaf_nodes():
+            for node in self.get_leaf_nodes(local_root=self._root):
                 if node.label == 0:  # 0 represent a continuation
                     pass
                 elif not isinstance(node.label, list):
@@ -372,32 +664,60 @@ class RhythmTree(Tree):
                                         + "should be an integer expressing the MIDI note number or 0 for a continuation."
                                     )
 
+    def __getstate__(self):
+        # the node ticks are indexed by id of the nodes, so they are not valid in another process
+        state = Tree.__getstate__(self)
+        state["_ticks"] = None
+        return state
+
+    def _clear_caches(self):
+        Tree._clear_caches(self)
+        self._ticks = None
+
+    def _get_ticks(self):
+        """Return the ticks of the tree, as computed by _subtree_ticks(), computed at the first call and if the tree has been modified."""
+        self._check_caches()
+        if self._ticks is None:
+            self._ticks = _subtree_ticks(self._root)
+        return self._ticks
+
+    def get_leaves_ticks(self):
+        """Return the onsets and the durations of all leaves in integer ticks, computed in O(n) at the first call.
+
+        The duration of the root is resolution ticks. The ticks are computed again if the tree has been modified.
+
+        Returns:
+            tuple: (onsets, durations, resolution), where onsets and durations are int64 arrays in the leaves order.
+        """
+        onsets, durations, resolution, _ = self._get_ticks()
+        return onsets, durations, resolution
+
     def node_duration(self, node):
+        _, _, resolution, node_ticks = self._get_ticks()
+        if id(node) in node_ticks:
+            return Fraction(int(node_ticks[id(node)][1]), resolution)
+        # a node that is not in the tree
         duration = Fraction(1)
         for a in self.get_ancestors(node):
             duration = duration / len(a.children)
         return duration
 
     def get_leaves_timestamps(self, node=None):
-        if node is None:
-            node = self.root
-        if isinstance(node, LeafNode):  # stop recursion
-            return np.array([Fraction(0, 1)])
-        else:  # recursive call: take the children results, shrink and shift it
-            return np.concatenate(
-                [
-                    self.get_leaves_timestamps(node=c) / len(node.children)
-                    + Fraction(i) / len(node.children)
-                    for i, c in enumerate(node.children)
-                ]
-            )
+        """Return the onsets of the leaves under node (by default the root), relative to the duration of node."""
+        if node is None or node is self._root:
+            onsets, _, resolution, _ = self._get_ticks()
+        else:
+            onsets, _, resolution, _ = _subtree_ticks(node)
+        return np.array([Fraction(int(t), resolution) for t in onsets])
 
     def get_timeline(self, start=0, end=1):
-        leaves_timestamps = self.get_leaves_timestamps()
-        leaves_labels = [node.label for node in self.get_leaf_nodes()]
+        onsets, _, resolution, _ = self._get_ticks()
+        leaves_labels = [
+            node.label for node in self.get_leaf_nodes(local_root=self._root)
+        ]
         events = [
-            Event(t, pitches)
-            for label, t in zip(leaves_labels, leaves_timestamps)
+            Event(Fraction(int(t), resolution), pitches)
+            for label, t in zip(leaves_labels, onsets)
             for pitches in label
             if pitches != CONTINUATION_SYMBOL
         ]
@@ -405,6 +725,242 @@ class RhythmTree(Tree):
         return timeline.shift_and_rescale(start, end)
 
 
+def _subtree_ticks(local_root):
+    """Compute the onsets and the durations of the leaves under a node, with two depth-first visits.
+
+    The resolution is the lcm of the product of the number of children on the path to each leaf,
+    so all nodes start and last an integer number of ticks, and local_root lasts resolution ticks.
+
+    Returns:
+        tuple: (onsets, durations, resolution, node_ticks), where onsets and durations are int64 arrays
+            in the leaves order and node_ticks contains the couple (start, duration) of each node, indexed by node id.
+            Interned nodes are not in node_ticks, because they can appear in more positions of the tree.
+    """
+    resolution = 1
+    to_visit = [(local_root, 1)]
+    while len(to_visit) > 0:
+        node, divisions = to_visit.pop()
+        if node.type == "leaf":
+            resolution = _lcm(resolution, divisions)
+        else:
+            for c in node.children:
+                to_visit.append((c, divisions * len(node.children)))
+
+    onsets = []
+    durations = []
+    node_ticks = {}
+    to_visit = [(local_root, 0, resolution)]
+    while len(to_visit) > 0:
+        node, start, duration = to_visit.pop()
+        if not node._interned:
+            node_ticks[id(node)] = (start, duration)
+        if node.type == "leaf":
+            onsets.append(start)
+            durations.append(duration)
+        else:
+            child_duration = duration // len(node.children)
+            for i in reversed(range(len(node.children))):
+                to_visit.append(
+                    (node.children[i], start + i * child_duration, child_duration)
+                )
+    return (
+        np.array(onsets, dtype=np.int64),
+        np.array(durations, dtype=np.int64),
+        resolution,
+        node_ticks,
+    )
+
+
+class FlatTree:
+    """A compact representation of a tree, with integer arrays instead of Node objects.
+
+    Nodes are identified by their index in depth-first order, so the root is 0 
+    and the subtree of a node is a contiguous range of indices.
+    The structure is encoded in the arrays parent, first_child and next_sibling (-1 if the node does not exist)
+    and node_types (0 for root, 1 for internal, 2 for leaf).
+    Labels are stored once in a label table, and each node contains the index of its label.
+
+    This class gives the same functions of Tree, working on node indices instead of Nodes.
+    """
+
+    NODE_TYPES = ("root", "internal", "leaf")
+
+    def __init__(
+        self,
+        parent,
+        first_child,
+        next_sibling,
+        node_types,
+        label_ids,
+        labels,
+        tree_class=Tree,
+        tree_type=None,
+    ):
+        """Initialize the flat tree from its arrays. Use FlatTree.from_tree() to convert a Tree.
+
+        Args:
+            parent (array): the index of the parent of each node
+            first_child (array): the index of the first child of each node
+            next_sibling (array): the index of the next sibling of each node
+            node_types (array): the type of each node, as index in NODE_TYPES
+            label_ids (array): the index in the label table of the label of each node
+            labels (list): the label table
+            tree_class (class, optional): the class used by to_tree(). Defaults to Tree.
+            tree_type (str, optional): the tree type for NotationTrees. Defaults to None.
+        """
+        self.parent = np.asarray(parent, dtype=np.int32)
+        self.first_child = np.asarray(first_child, dtype=np.int32)
+        self.next_sibling = np.asarray(next_sibling, dtype=np.int32)
+        self.node_types = np.asarray(node_types, dtype=np.int8)
+        self.label_ids = np.asarray(label_ids, dtype=np.int32)
+        self.labels = labels
+        self.tree_class = tree_class
+        self.tree_type = tree_type
+        # depth of each node. Parents always come before their children
+        self.depth = np.zeros(len(self.parent), dtype=np.int32)
+        for i in range(1, len(self.parent)):
+            self.depth[i] = self.depth[self.parent[i]] + 1
+
+    @classmethod
+    def from_tree(cls, tree):
+        """Create a FlatTree from a Tree (e.g. NotationTree or RhythmTree).
+
+        Args:
+            tree (Tree): the tree to convert
+
+        Returns:
+            FlatTree: the flat tree
+        """
+        parent = []
+        first_child = []
+        next_sibling = []
+        node_types = []
+        label_ids = []
+        labels = []
+        label_table = {}  # the index of each label in labels, indexed by its string
+        last_child = {}  # the last child created for each node
+        stack = [(tree._root, -1)]  # iterative depth-first visit, that keeps the interned subtrees shared
+        while len(stack) > 0:
+            node, parent_index = stack.pop()
+            index = len(parent)
+            if parent_index != -1:
+                if first_child[parent_index] == -1:
+                    first_child[parent_index] = index
+                else:  # link the previous sibling, that is the last created child
+                    next_sibling[last_child[parent_index]] = index
+                last_child[parent_index] = index
+            parent.append(parent_index)
+            first_child.append(-1)
+            next_sibling.append(-1)
+            node_types.append(cls.NODE_TYPES.index(node.type))
+            key = repr(node.label)
+            if key not in label_table:
+                label_table[key] = len(labels)
+                labels.append(node.label)
+            label_ids.append(label_table[key])
+            for c in reversed(node.children):
+                stack.append((c, index))
+        return cls(
+            parent,
+            first_child,
+            next_sibling,
+            node_types,
+            label_ids,
+            labels,
+            tree_class=type(tree),
+            tree_type=getattr(tree, "tree_type", None),
+        )
+
+    def to_tree(self):
+        """Create the Node structure corresponding to this FlatTree.
+
+        Returns:
+            Tree: a tree of class tree_class (e.g. NotationTree or RhythmTree)
+        """
+        nodes = [Root()]
+        for i in range(1, len(self.parent)):
+            parent = nodes[self.parent[i]]
+            if self.node_types[i] == 2:
+                nodes.append(LeafNode(parent, self.get_label(i)))
+            else:
+                nodes.append(InternalNode(parent, self.get_label(i)))
+        if issubclass(self.tree_class, NotationTree):
+            return self.tree_class(nodes[0], tree_type=self.tree_type)
+        else:
+            return self.tree_class(nodes[0])
+
+    def __len__(self):
+        return len(self.parent)
+
+    def get_label(self, node):
+        """Return the label of a node."""
+        return self.labels[self.label_ids[node]]
+
+    def get_children(self, node):
+        """Return a list with the children of a node."""
+        children = []
+        child = self.first_child[node]
+        while child != -1:
+            children.append(int(child))
+            child = self.next_sibling[child]
+        return children
+
+    def subtree_end(self, node):
+        """Return the index after the last node in the subtree of node."""
+        while node != -1 and self.next_sibling[node] == -1:
+            node = self.parent[node]
+        return len(self.parent) if node == -1 else int(self.next_sibling[node])
+
+    def get_nodes(self, local_root=0):
+        """Return a list with all nodes in the (sub)tree."""
+        return list(range(local_root, self.subtree_end(local_root)))
+
+    def get_leaf_nodes(self, local_root=0):
+        """Return a list with all Leaf Nodes in the (sub)tree."""
+        end = self.subtree_end(local_root)
+        return [
+            int(i) + local_root
+            for i in np.flatnonzero(self.node_types[local_root:end] == 2)
+        ]
+
+    def get_depth(self, node):
+        """Return the depth of a node in the tree."""
+        return int(self.depth[node])
+
+    def get_ancestors(self, node):
+        """Get a list of all the ancestors in the tree of a node."""
+        ancestors = []
+        node = self.parent[node]
+        while node != -1:
+            ancestors.append(int(node))
+            node = self.parent[node]
+        return ancestors
+
+    def get_lca(self, node1, node2):
+        """Get the lower common ancestor (lca) of two input nodes.
+
+        Args:
+            node1 (int): the first node to consider.
+            node2 (int): the second node to consider.
+
+        Returns:
+            int: the lca of the input nodes.
+        """
+        if not (0 <= node1 < len(self.parent) and 0 <= node2 < len(self.parent)):
+            raise Exception("Input nodes should belong to the Notation Tree")
+        if node1 == node2:
+            raise Exception("The two inputs must be distinct nodes")
+        # climb from the deepest node until the two nodes are at the same depth
+        while self.depth[node1] > self.depth[node2]:
+            node1 = self.parent[node1]
+        while self.depth[node2] > self.depth[node1]:
+            node2 = self.parent[node2]
+        while node1 != node2:
+            node1 = self.parent[node1]
+            node2 = self.parent[node2]
+        return int(node1)
+
+
 def simplify_label(label):
     """Create a simple string representation of the notation tree leaf node labels for a better visualization.
 
@@ -463,7 +1019,13 @@ def gracenote2string(gracenote):
 
 
 def timeline2rt(
-    tim: Timeline, allowed_divisions=[2, 3], max_depth=7, div_preferences=None
+    tim: Timeline,
+    allowed_divisions=[2, 3],
+    max_depth=7,
+    div_preferences=None,
+    memoize=True,
+    prune=True,
+    intern_table=None,
 ):
     """Generate a Rhythm Tree from a timeline.
 
@@ -472,12 +1034,33 @@ def timeline2rt(
         allowed_divisions (list, optional): division to consider. Defaults to [2, 3].
         max_depth (int, optional): maximum depth to consider. Defaults to 7.
         div_preferences ([type], optional): different depth may have different preferred div values. Defaults to None.
+        memoize (bool, optional): reuse the solutions of identical sub-timelines instead of exploring them again. 
+            The resulting tree is the same. Defaults to True.
+        prune (bool, optional): with memoize, abandon the division values that cannot give less leaves 
+            than the best one found so far (branch-and-bound). The resulting tree is the same. Defaults to True.
+        intern_table (dict, optional): with memoize, a dictionary shared between calls where the subtrees are interned, 
+            so that identical subtrees of all the generated trees are stored only once.
+            A weakref.WeakValueDictionary frees the subtrees that are not used anymore.
+            The tree is copied when its nodes are accessed, see Tree.unshare(). Defaults to None.
 
     Returns:
         RhythmTree: the rhythm tree.
     """
-    tim = tim.shift_and_rescale(new_start=0, new_end=1)  # rescale the input timeline
+    # rescale the input timeline, and split it with views that do not copy the events
+    tim = tim.shift_and_rescale(new_start=0, new_end=1).view()
     root = Root()
+    if memoize:
+        solution = _memoized_timeline2rt(
+            tim, 0, {}, allowed_divisions, max_depth, div_preferences, prune
+        )
+        if solution is None:
+            print("Multiple minimum leaves tree for the input timeline")
+            return None
+        if intern_table is None:
+            _solution2subtree(solution, root)
+        else:
+            root.add_child(_solution2interned_subtree(solution, intern_table))
+        return RhythmTree(root)
     __timeline2rt(tim, 0, root, allowed_divisions, max_depth, div_preferences)
     if (
         isinstance(root.children[0], InternalNode)
@@ -568,3 +1151,162 @@ def __timeline2rt(
             else:  # connect this to the subtree parent
                 subtree_parent.add_child(valid_choices[min_indices[0]])
                 valid_choices[min_indices[0]].parent = subtree_parent
+
+
+# returned by _memoized_timeline2rt when the subtree cannot have less leaves than the budget
+_PRUNED = "pruned"
+
+
+def _memoized_timeline2rt(
+    tim: Timeline,
+    depth: int,
+    memo: dict,
+    allowed_divisions: list,
+    max_depth: int,
+    div_preferences,
+    prune: bool = False,
+    budget=None,
+):
+    """Memoized version of __timeline2rt, called from timeline2rt.
+
+    All sub-timelines are normalized in [0,1[, so the best subtree only depends on the events and on the depth.
+    Instead of nodes, it returns a solution, i.e. a tuple (number_of_leaves, label, children) 
+    where children is None for leaves and a tuple of solutions for internal nodes.
+    The nodes are created only at the end, for the chosen tree, with _solution2subtree.
+
+    If prune is True, it performs a branch-and-bound search: a division value is abandoned as soon as
+    the leaves of its solved children, plus a lower bound for the others (the number of distinct onsets),
+    exceed the best number of leaves found so far. Ties are never pruned, so the tree is the same.
+
+    Args:
+        tim (TimelineView): the input timeline (or a Timeline, that is converted in a view).
+            The codes of its musical artifacts are used in the keys of memo
+        depth (int): the depth of the recursion
+        memo (dict): the solutions (or the lower bounds for pruned searches) already computed, indexed by (events, depth)
+        allowed_divisions (list): the list of divisions values explored by the algorithm
+        max_depth (int): the maximum depth of the recursion
+        div_preferences (list | None): which division to accept at each level in case of multiple minima.
+        prune (bool, optional): use branch-and-bound. Defaults to False.
+        budget (int | None, optional): the maximum number of leaves we are interested in. Defaults to None.
+
+    Returns:
+        tuple: the solution, None if no valid (and unique) subtree exists, 
+        or _PRUNED if the subtree does not exist or has more leaves than budget.
+    """
+    if isinstance(tim, Timeline):  # the keys of memo need the codes of a view
+        tim = tim.view()
+    timestamps = tuple(tim.get_timestamps())
+    key = (timestamps, tim.get_artifact_codes(), depth)
+    lower_bound = len(set(timestamps))  # each onset needs a different leaf
+    if key in memo:
+        if not isinstance(memo[key], int):  # exact solution
+            return memo[key]
+        lower_bound = memo[key]  # a previous search was pruned
+    if budget is not None and lower_bound > budget:
+        return _PRUNED
+
+    if depth >= max_depth:  # stop recursion because maximum depth is reached
+        solution = None
+    elif all(
+        [t == 0 for t in timestamps]
+    ):  # stop recursion if all events are on the left border of the timeline
+        solution = (1, tim.get_musical_artifacts(), None)
+    else:
+        valid_choices = []  # solutions corresponding to different division values
+        best = budget  # the maximum number of leaves of an interesting choice
+        pruned = False
+        for k in allowed_divisions:
+            subtims = tim.split(k, normalize=True)
+            lower_bounds = [len(set(st.get_timestamps())) for st in subtims]
+            children = []
+            for i, subtim in enumerate(subtims):
+                child_budget = None
+                if prune and best is not None:
+                    child_budget = (
+                        best
+                        - sum([c[0] for c in children])
+                        - sum(lower_bounds[i + 1 :])
+                    )
+                child = _memoized_timeline2rt(
+                    subtim,
+                    depth + 1,
+                    memo,
+                    allowed_divisions,
+                    max_depth,
+                    div_preferences,
+                    prune,
+                    child_budget,
+                )
+                if child is None:  # this division value is not valid
+                    break
+                if child is _PRUNED or (
+                    child_budget is not None and child[0] > child_budget
+                ):  # this division value cannot beat the best one
+                    pruned = True
+                    break
+                children.append(child)
+            else:
+                valid_choices.append(
+                    (sum([c[0] for c in children]), "", tuple(children))
+                )
+                if prune:
+                    leaves = valid_choices[-1][0]
+                    best = leaves if best is None else min(best, leaves)
+        if len(valid_choices) == 0 and pruned:  # all subtrees exceed the budget
+            memo[key] = budget + 1
+            return _PRUNED
+        elif len(valid_choices) == 0:  # no valid choice available
+            solution = None
+        else:
+            # find the best division value, i.e. the one generating the tree with minimum number of leaves
+            min_leaves = min([c[0] for c in valid_choices])
+            min_choices = [c for c in valid_choices if c[0] == min_leaves]
+            if len(min_choices) == 1:
+                solution = min_choices[0]
+            elif div_preferences is None:  # min is not unique, we stop the recursion
+                solution = None
+            else:  # we select one based on div_preferences
+                solution = [
+                    c for c in min_choices if len(c[2]) == div_preferences[depth]
+                ][0]
+    memo[key] = solution
+    return solution
+
+
+def _solution2subtree(solution, subtree_parent):
+    """Create the nodes corresponding to a solution of _memoized_timeline2rt under subtree_parent."""
+    _, label, children = solution
+    if children is None:
+        LeafNode(subtree_parent, list(label))
+    else:
+        node = InternalNode(subtree_parent, label)
+        for child in children:
+            _solution2subtree(child, node)
+
+
+def _solution2interned_subtree(solution, intern_table):
+    """Return the interned node corresponding to a solution of _memoized_timeline2rt, creating it if it is not in intern_table.
+
+    Interned nodes are indexed by their structural hash and have no parent, because they can be shared.
+    """
+    _, label, children = solution
+    if children is None:
+        key = _structural_digest("leaf", label, [])
+    else:
+        interned_children = [
+            _solution2interned_subtree(c, intern_table) for c in children
+        ]
+        key = _structural_digest(
+            "internal", label, [c.structural_hash() for c in interned_children]
+        )
+    node = intern_table.get(key)
+    if node is None:  # create the node
+        if children is None:
+            node = LeafNode(None, list(label))
+        else:
+            node = InternalNode(None, label)
+            for c in interned_children:
+                node.add_child(c)
+        node._interned = True
+        intern_table[key] = node
+    return node
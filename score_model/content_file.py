@@ -0,0 +1,238 @@
+import numbers
+import os
+from collections.abc import Sequence
+from fractions import Fraction
+
+import numpy as np
+
+from score_model.constant import CONTINUATION_SYMBOL, REST_SYMBOL
+from score_model.music_sequences import (
+    Timeline,
+    MusicalContent,
+    TIMELINE_BACKENDS,
+    _as_fraction,
+    _to_object_array,
+)
+
+# the file starts with MAGIC, the format version and the number of voices
+MAGIC = b"MSCONTNT"
+FORMAT_VERSION = 1
+HEADER_DTYPE = np.dtype([("magic", "S8"), ("version", "<i8"), ("n_voices", "<i8")])
+# then a table with one record for each voice
+VOICE_DTYPE = np.dtype(
+    [
+        ("n_events", "<i8"),
+        ("n_pitches", "<i8"),
+        ("resolution", "<i8"),
+        ("start_numerator", "<i8"),
+        ("start_denominator", "<i8"),
+        ("end_numerator", "<i8"),
+        ("end_denominator", "<i8"),
+        ("offset", "<i8"),  # the position of the block of the voice in the file
+    ]
+)
+# and one block for each voice, with the arrays:
+# onsets (int64, numerators over the resolution of the voice),
+# artifact_offsets (int64, the position of the pitches of each event in the pitches array),
+# pitches (int16, the MIDI numbers of all the events), kinds (int8, one of the following)
+PITCHES_KIND = 0
+REST_KIND = 1
+CONTINUATION_KIND = 2
+
+
+def _block_size(n_events: int, n_pitches: int) -> int:
+    """Return the size in bytes of the block of a voice, padded to a multiple of 8."""
+    size = 8 * n_events + 8 * (n_events + 1) + 2 * n_pitches + n_events
+    return size + (-size) % 8
+
+
+def _encode_artifacts(artifacts):
+    """Encode a list of musical artifacts in the arrays (artifact_offsets, pitches, kinds).
+
+    Raises:
+        TypeError: if a musical artifact is not a list of MIDI numbers, a rest or a continuation
+    """
+    kinds = np.full(len(artifacts), PITCHES_KIND, dtype=np.int8)
+    artifact_offsets = np.zeros(len(artifacts) + 1, dtype=np.int64)
+    pitches = []
+    for i, artifact in enumerate(artifacts):
+        if isinstance(artifact, numbers.Integral) and artifact == REST_SYMBOL:
+            kinds[i] = REST_KIND
+        elif isinstance(artifact, numbers.Integral) and artifact == CONTINUATION_SYMBOL:
+            kinds[i] = CONTINUATION_KIND
+        else:
+            try:
+                midi_numbers = [int(p) for p in artifact]
+            except (TypeError, ValueError):
+                raise TypeError(
+                    artifact, "is not a valid musical artifact. It must be a list of MIDI numbers"
+                )
+            pitches.extend(midi_numbers)
+        artifact_offsets[i + 1] = len(pitches)
+    return artifact_offsets, np.array(pitches, dtype=np.int16), kinds
+
+
+def _decode_artifacts(artifact_offsets, pitches, kinds):
+    """Decode the arrays (artifact_offsets, pitches, kinds) in a numpy array of musical artifacts."""
+    pitches = pitches.tolist()
+    bounds = artifact_offsets.tolist()
+    artifacts = []
+    for i, kind in enumerate(kinds.tolist()):
+        if kind == REST_KIND:
+            artifacts.append(REST_SYMBOL)
+        elif kind == CONTINUATION_KIND:
+            artifacts.append(CONTINUATION_SYMBOL)
+        else:
+            artifacts.append(pitches[bounds[i] : bounds[i + 1]])
+    return _to_object_array(artifacts)
+
+
+def write_musical_content(content: MusicalContent, path: str):
+    """Write a MusicalContent in a binary file, that can be read with read_musical_content().
+
+    The file has a header, a table with the interval and the sizes of each voice, and for each voice
+    a block of contiguous arrays: the onsets, the artifact offsets, the flattened MIDI pitches and the kind of each artifact.
+    The voices are written one at a time.
+
+    Args:
+        content (MusicalContent): the musical content, with musical artifacts that are lists of MIDI numbers, rests or continuations
+        path (str): the path of the file
+
+    Raises:
+        TypeError: if a musical artifact can not be encoded
+    """
+    n_voices = len(content.timelines)
+    table = np.zeros(n_voices, dtype=VOICE_DTYPE)
+    offset = HEADER_DTYPE.itemsize + VOICE_DTYPE.itemsize * n_voices
+    with open(str(path), "wb") as f:
+        header = np.array([(MAGIC, FORMAT_VERSION, n_voices)], dtype=HEADER_DTYPE)
+        f.write(header.tobytes())
+        f.write(table.tobytes())  # the table is written again at the end
+        for i, timeline in enumerate(content.timelines):
+            ticks, resolution, artifacts = timeline._columns()
+            artifact_offsets, pitches, kinds = _encode_artifacts(artifacts)
+            start = _as_fraction(timeline.start)
+            end = _as_fraction(timeline.end)
+            table[i] = (
+                len(ticks),
+                len(pitches),
+                resolution,
+                start.numerator,
+                start.denominator,
+                end.numerator,
+                end.denominator,
+                offset,
+            )
+            block = b"".join(
+                [
+                    np.asarray(ticks, dtype="<i8").tobytes(),
+                    artifact_offsets.astype("<i8").tobytes(),
+                    pitches.astype("<i2").tobytes(),
+                    kinds.tobytes(),
+                ]
+            )
+            block_size = _block_size(len(ticks), len(pitches))
+            f.write(block + bytes(block_size - len(block)))
+            offset += block_size
+        f.seek(HEADER_DTYPE.itemsize)
+        f.write(table.tobytes())
+
+
+def _fraction(numerator, denominator):
+    """Return an int if the denominator is 1, as the intervals of the timelines usually are."""
+    if denominator == 1:
+        return int(numerator)
+    return Fraction(int(numerator), int(denominator))
+
+
+class MappedTimelines(Sequence):
+    """The timelines of a file written with write_musical_content(), read lazily from a memory-mapped buffer.
+
+    Each Timeline is built when it is accessed, so only the voices that are used are decoded.
+    Different processes that read the same file share the pages of the memory map.
+    """
+
+    def __init__(self, buffer, table, backend: str = "columnar"):
+        self._buffer = buffer
+        self._table = table
+        self.backend = backend
+
+    def __len__(self):
+        return len(self._table)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        record = self._table[index]
+        n_events = int(record["n_events"])
+        n_pitches = int(record["n_pitches"])
+        offset = int(record["offset"])
+        ticks = np.frombuffer(self._buffer, dtype="<i8", count=n_events, offset=offset)
+        offset += 8 * n_events
+        artifact_offsets = np.frombuffer(
+            self._buffer, dtype="<i8", count=n_events + 1, offset=offset
+        )
+        offset += 8 * (n_events + 1)
+        pitches = np.frombuffer(self._buffer, dtype="<i2", count=n_pitches, offset=offset)
+        offset += 2 * n_pitches
+        kinds = np.frombuffer(self._buffer, dtype=np.int8, count=n_events, offset=offset)
+        timeline = Timeline._from_columns(
+            ticks,
+            int(record["resolution"]),
+            _decode_artifacts(artifact_offsets, pitches, kinds),
+            start=_fraction(record["start_numerator"], record["start_denominator"]),
+            end=_fraction(record["end_numerator"], record["end_denominator"]),
+        )
+        if self.backend == "object":
+            return Timeline(timeline.events, timeline.start, timeline.end)
+        return timeline
+
+
+def read_musical_content(path: str, backend: str = "columnar") -> MusicalContent:
+    """Read a MusicalContent from a file written with write_musical_content().
+
+    The file is memory-mapped and only the header and the table of the voices are read.
+    The timelines are decoded when they are accessed.
+
+    Args:
+        path (str): the path of the file
+        backend (str, optional): the backend of the timelines, either "object" or "columnar". Defaults to "columnar".
+
+    Raises:
+        TypeError: if the file is not a valid musical content file (e.g. empty or truncated), or if backend is invalid
+
+    Returns:
+        MusicalContent: the musical content, whose timelines are a MappedTimelines
+    """
+    if backend not in TIMELINE_BACKENDS:
+        raise TypeError(
+            backend,
+            "is not a valid backend. backend must be either 'object' or 'columnar'",
+        )
+    # check the sizes before mapping the file, an empty file cannot be mapped
+    file_size = os.path.getsize(str(path))
+    if file_size < HEADER_DTYPE.itemsize:
+        raise TypeError(path, "is not a valid musical content file")
+    buffer = np.memmap(str(path), dtype=np.uint8, mode="r")
+    header = np.frombuffer(buffer, dtype=HEADER_DTYPE, count=1)[0]
+    if header["magic"] != MAGIC or header["version"] != FORMAT_VERSION:
+        raise TypeError(path, "is not a valid musical content file")
+    n_voices = int(header["n_voices"])
+    table_end = HEADER_DTYPE.itemsize + VOICE_DTYPE.itemsize * n_voices
+    if n_voices < 0 or file_size < table_end:
+        raise TypeError(path, "is truncated, the table of the voices is incomplete")
+    table = np.frombuffer(
+        buffer, dtype=VOICE_DTYPE, count=n_voices, offset=HEADER_DTYPE.itemsize,
+    )
+    for record in table:
+        n_events = int(record["n_events"])
+        n_pitches = int(record["n_pitches"])
+        offset = int(record["offset"])
+        if (
+            n_events < 0
+            or n_pitches < 0
+            or offset < table_end
+            or offset + _block_size(n_events, n_pitches) > file_size
+        ):
+            raise TypeError(path, "is truncated, the block of a voice is incomplete")
+    return MusicalContent(MappedTimelines(buffer, table, backend))
@@ -7,6 +7,7 @@ from .constant import REST_SYMBOL, CONTINUATION_SYMBOL
 import math
 import copy
 from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
 
 
 ## functions to extract descriptors from music21 to create Notation Trees
@@ -211,13 +212,18 @@ def correct_beamings(beamings_list, gn_list):
     Returns:
         list: a corrected sequential structure for beamings.
     """
+    return _correct_beamings(beamings_list, [gn.isRest for gn in gn_list])
+
+
+def _correct_beamings(beamings_list, rest_list):
+    """Implement correct_beamings() given a list of booleans saying if each general note is a rest."""
     new_beaming_list = copy.deepcopy(beamings_list)
     # find groups of consecutive rests (also of size 1)
     index_to_check = []
     start = -1
     end = -1
-    for i, gn in enumerate(gn_list):
-        if gn.isRest:
+    for i, is_rest in enumerate(rest_list):
+        if is_rest:
             if start == -1:  # first rest of the sequence
                 start = i
                 end = i
@@ -307,56 +313,151 @@ def m21_2_notationtree(
     # extract information from general note
     seq_structure, grouping_info = m21_2_seq_struct(gn_list, tree_type)
     leaf_label_list = [gn2label(gn) for gn in gn_list]
-    # set the tree
-    root = Root()
-    _recursive_tree_generation(seq_structure, leaf_label_list, grouping_info, root, 0)
-    return NotationTree(root, tree_type=tree_type)
+    return seq_struct2notationtree(
+        seq_structure, grouping_info, leaf_label_list, tree_type
+    )
 
 
-def _recursive_tree_generation(
-    seq_structure, leaf_label_list, grouping_info, local_root, depth
+def m21_2_notation_descriptors(
+    gn_list: Iterable[m21.note.GeneralNote], consider_grace_notes: bool = False
+) -> dict:
+    """Extract the labels and the sequential structures of beamings and tuplets with a single pass on the general notes.
+
+    Args:
+        gn_list (Iterable[m21.note.GeneralNote]): a list of music21 GeneralNote objects in a voice in a measure
+        consider_grace_notes (bool, optional): consider or not grace notes in the structure. Defaults to False.
+
+    Returns:
+        dict: with keys "labels" (list of gn labels), "beamings" and "tuplets" (couples (seq_structure, grouping_info)).
+    """
+    labels = []
+    beamings = []
+    tuplets = []
+    tuplets_info = []
+    rests = []
+    for gn in gn_list:
+        if not consider_grace_notes and is_grace(gn):
+            continue
+        labels.append(gn2label(gn))
+        beamings.append(get_beams(gn))
+        tuplets.append(get_tuplets(gn))
+        tuplets_info.append(get_tuplets_info(gn))
+        rests.append(gn.isRest)
+    beamings = _correct_beamings(beamings, rests)
+    return {
+        "labels": labels,
+        "beamings": (beamings, [["" for ee in e] for e in beamings]),
+        "tuplets": (correct_tuplet(tuplets), tuplets_info),
+    }
+
+
+def m21_2_notationtrees(
+    gn_list: Iterable[m21.note.GeneralNote], consider_grace_notes: bool = False
 ):
-    """Recursive function to generate the notation tree, called from m21_2_notationtree()."""
-    temp_int_node = None
-    start_index = None
-    stop_index = None
+    """Generate both the beaming tree and the tuplet tree of a voice in a measure, with a single pass on the general notes.
+
+    Args:
+        gn_list (Iterable[m21.note.GeneralNote]): a list of music21 GeneralNote objects
+        consider_grace_notes (bool) : consider or not grace notes in the structure. WARNING only simple grace notes groups are supported
+
+    Returns:
+        tuple: (BT, TT), that share the same leaf labels.
+    """
+    return _notation_descriptors2trees(
+        m21_2_notation_descriptors(gn_list, consider_grace_notes)
+    )
+
+
+def _notation_descriptors2trees(descriptors):
+    """Build the couple (BT, TT) from the labels and the sequential structures of a voice."""
+    bt = seq_struct2notationtree(
+        *descriptors["beamings"], descriptors["labels"], "beamings"
+    )
+    tt = seq_struct2notationtree(
+        *descriptors["tuplets"], descriptors["labels"], "tuplets"
+    )
+    return bt, tt
+
+
+def seq_struct2notationtree(
+    seq_structure, grouping_info, leaf_label_list, tree_type: str
+) -> NotationTree:
+    """Generate a notation tree from the sequential structure of a voice in a measure.
+
+    The sequential structure is parsed in a single pass, keeping a stack with the groups (beams or tuplets)
+    that are open at each depth, so there is no recursion and no copy of the input lists.
+
+    Args:
+        seq_structure (list): the sequential structure, as returned by m21_2_seq_struct()
+        grouping_info (list): the grouping info, as returned by m21_2_seq_struct()
+        leaf_label_list (list): the labels of the general notes, as returned by gn2label()
+        tree_type (str): either "beamings" or "tuplets"
+
+    Raises:
+        TypeError: if the sequential structure is not valid.
+
+    Returns:
+        NotationTree: the notation tree (BT or TT)
+    """
+    root = Root()
+    # open_groups[d] is the internal node of the group open at depth d
+    open_groups = []
     for i, n in enumerate(seq_structure):
-        if len(n[depth:]) == 0:  # no beaming/tuplets
-            assert start_index is None, "no beaming/tuplets start_index "
-            assert stop_index is None, "no beaming/tuplets stop_index "
-            LeafNode(local_root, leaf_label_list[i])
-        elif n[depth] == "partial":  # partial beaming (only for BTs)
-            assert start_index is None, "partial beaming start_index "
-            assert stop_index is None, "partial beaming stop_index "
-            # there are more levels of beam otherwise we would be on the previous case
-            temp_int_node = InternalNode(local_root, grouping_info[i][depth])
-            _recursive_tree_generation(
-                [n], [leaf_label_list[i]], [grouping_info[i]], temp_int_node, depth + 1,
-            )
-            temp_int_node = None
-        elif n[depth] == "start":  # start of a beam/tuplet
-            assert start_index is None, "start of a beam/tuplet start_index "
-            assert stop_index is None, "start of a beam/tuplet stop_index "
-            start_index = i
-        elif n[depth] == "continue":
-            assert start_index is not None, "continue start_index "
-            assert stop_index is None, "continue stop_index "
-        elif n[depth] == "stop":
-            assert start_index is not None, "stop start_index "
-            assert stop_index is None, "stop stop_index "
-            stop_index = i
-            temp_int_node = InternalNode(local_root, grouping_info[i][depth])
-            _recursive_tree_generation(
-                seq_structure[start_index : stop_index + 1],
-                leaf_label_list[start_index : stop_index + 1],
-                grouping_info[start_index : stop_index + 1],
-                temp_int_node,
-                depth + 1,
+        if len(n) < len(open_groups):
+            raise TypeError(
+                "Note {} has no beaming/tuplets at depth {}, inside an open group".format(
+                    i, len(n)
+                )
             )
-            # reset the variables
-            temp_int_node = None
-            start_index = None
-            stop_index = None
+        parent = root
+        stop_depth = None  # the lowest depth of the groups closed by this note
+        in_partial = False  # if the note is under a partial beaming
+        for depth, value in enumerate(n):
+            if depth < len(open_groups):  # inside a group opened by a previous note
+                if value == "stop":
+                    if stop_depth is None:
+                        stop_depth = depth
+                    # the group takes the information of the last note
+                    open_groups[depth].label = grouping_info[i][depth]
+                elif value != "continue":
+                    raise TypeError(
+                        "Note {} has '{}' at depth {}, inside an open group".format(
+                            i, value, depth
+                        )
+                    )
+                elif stop_depth is not None:
+                    raise TypeError(
+                        "Note {} continues a group at depth {} after closing its parent".format(
+                            i, depth
+                        )
+                    )
+                parent = open_groups[depth]
+            elif value == "partial":  # partial beaming (only for BTs)
+                parent = InternalNode(parent, grouping_info[i][depth])
+                in_partial = True
+            elif value == "start":
+                if in_partial or stop_depth is not None:
+                    raise TypeError(
+                        "Note {} starts a group at depth {} that cannot be closed".format(
+                            i, depth
+                        )
+                    )
+                parent = InternalNode(parent, None)
+                open_groups.append(parent)
+            else:
+                raise TypeError(
+                    "Note {} has '{}' at depth {}, outside of an open group".format(
+                        i, value, depth
+                    )
+                )
+        if stop_depth is not None:
+            del open_groups[stop_depth:]
+        LeafNode(parent, leaf_label_list[i])
+    if len(open_groups) > 0:
+        raise TypeError(
+            "The group started at depth {} is not closed".format(len(open_groups) - 1)
+        )
+    return NotationTree(root, tree_type=tree_type)
 
 
 def get_tuplets_info(gn):
@@ -391,9 +492,10 @@ def nt2inter_gn_groupings(nt):
         list: A list of length [number_of_leaves - 1], with integers.
     """
     leaves = nt.get_leaf_nodes()
+    index = nt.get_lca_index()
     # find the connections between 2 adjacent leaves
-    leaves_connection = [nt.get_lca(n1, n2) for n1, n2 in window(leaves)]
-    return [nt.get_depth(n) for n in leaves_connection]
+    leaves_connection = [index.lca(n1, n2) for n1, n2 in window(leaves)]
+    return [index.depth(n) for n in leaves_connection]
 
 
 def nt2over_gn_groupings(nt):
@@ -408,8 +510,9 @@ def nt2over_gn_groupings(nt):
         list: A list of length [number_of_leaves], with integers.
     """
     leaves = nt.get_leaf_nodes()
+    index = nt.get_lca_index()
     # find the leaves depths in the tree
-    leaves_depths = [nt.get_depth(leaf) for leaf in leaves]
+    leaves_depths = [index.depth(leaf) for leaf in leaves]
     return [d - 1 for d in leaves_depths]
 
 
@@ -428,41 +531,30 @@ def nt2seq_structure(nt):
     Returns:
         couple: (seq_structure,grouping_info)
     """
-
-    def _nt2seq_structure(node):
+    leaves_counts = nt.get_leaves_counts()
+    n_leaves = leaves_counts[id(nt.root)]
+    seq_structure = [[] for _ in range(n_leaves)]
+    grouping_info = [[] for _ in range(n_leaves)]
+    # depth-first visit, each internal node adds its grouping to the leaves of its subtree
+    offset = 0  # the number of leaves before the current node
+    to_visit = list(reversed(nt.root.children))
+    while len(to_visit) > 0:
+        node = to_visit.pop()
         if node.type == "leaf":
-            return [[]], [[]]
-        else:
-            subtree_leaves = nt.get_leaf_nodes(local_root=node)
-            if len(subtree_leaves) > 1:
-                structure = (
-                    [["start"]]
-                    + [["continue"] for _ in subtree_leaves[1:-1]]
-                    + [["stop"]]
-                )
-                info = [[str(node.label)] for _ in subtree_leaves]
-            else:
-                structure = [["partial"]]
-                info = [[str(node.label)]]
-
-            offset = 0
-            for child in node.children:
-                low_struct, low_info = _nt2seq_structure(child)
-                for st, inf in zip(low_struct, low_info):
-                    structure[offset].extend(st)
-                    info[offset].extend(inf)
-                    offset += 1
-            return structure, info
-
-    seq_structure = [[] for _ in nt.get_leaf_nodes()]
-    grouping_info = [[] for _ in nt.get_leaf_nodes()]
-    offset = 0
-    for child in nt.root.children:
-        low_struct, low_info = _nt2seq_structure(child)
-        for st, inf in zip(low_struct, low_info):
-            seq_structure[offset].extend(st)
-            grouping_info[offset].extend(inf)
             offset += 1
+            continue
+        n_node_leaves = leaves_counts[id(node)]
+        if n_node_leaves > 1:
+            seq_structure[offset].append("start")
+            for i in range(offset + 1, offset + n_node_leaves - 1):
+                seq_structure[i].append("continue")
+            seq_structure[offset + n_node_leaves - 1].append("stop")
+        else:
+            seq_structure[offset].append("partial")
+        info = str(node.label)
+        for i in range(offset, offset + n_node_leaves):
+            grouping_info[i].append(info)
+        to_visit.extend(reversed(node.children))
 
     return seq_structure, grouping_info
 
@@ -631,7 +723,7 @@ def m21tuple_from_info(tuplet_info):
     return t
 
 
-def m21_2_timeline(gn_list):
+def m21_2_timeline(gn_list, backend="object"):
     # create the events
     events = [
         Event(gn.offset, REST_SYMBOL)
@@ -643,6 +735,7 @@ def m21_2_timeline(gn_list):
         events,
         start=0,
         end=sum([Fraction(gn.duration.quarterLength) for gn in gn_list]),
+        backend=backend,
     )
     return tim
 
@@ -655,6 +748,49 @@ def m21_2_rhythmtree(
     return timeline2rt(tim, allowed_divisions, max_depth, div_preferences)
 
 
+def m21_2_voice_descriptors(gn_list, consider_grace_notes: bool = False) -> dict:
+    """Extract the compact information needed to build the trees of a voice in a measure.
+
+    The output contains only timelines, labels and lists of strings, 
+    so it is cheap to pickle and can be sent to other processes.
+
+    Args:
+        gn_list (list of generalNotes): a list of music21 general notes in a measure (and a single voice)
+        consider_grace_notes (bool, optional): consider or not grace notes in the notation trees. Defaults to False.
+
+    Returns:
+        dict: with keys "timeline" (columnar Timeline), "labels" (list of gn labels),
+        "beamings" and "tuplets" (couples (seq_structure, grouping_info)).
+    """
+    gn_list = list(gn_list)
+    descriptors = m21_2_notation_descriptors(gn_list, consider_grace_notes)
+    descriptors["timeline"] = m21_2_timeline(gn_list, backend="columnar")
+    return descriptors
+
+
+def voice_descriptors2trees(
+    descriptors: dict, allowed_divisions=[2, 3], max_depth=7, div_preferences=None
+):
+    """Build the beaming tree, the tuplet tree and the rhythm tree of a voice in a measure.
+
+    Args:
+        descriptors (dict): the voice descriptors, as returned by m21_2_voice_descriptors()
+        allowed_divisions (list, optional): division to consider for the RT. Defaults to [2, 3].
+        max_depth (int, optional): maximum depth to consider for the RT. Defaults to 7.
+        div_preferences (list, optional): preferred div values for the RT. Defaults to None.
+
+    Returns:
+        tuple: (BT, TT, RT). The RT is None for empty voices or if it is not unique.
+    """
+    bt, tt = _notation_descriptors2trees(descriptors)
+    timeline = descriptors["timeline"]
+    if timeline.end == timeline.start:  # no duration, e.g. only grace notes
+        rt = None
+    else:
+        rt = timeline2rt(timeline, allowed_divisions, max_depth, div_preferences)
+    return bt, tt, rt
+
+
 def expected_stream_constituent_type(stream):
     """Determines the expected type of constituents of a stream in [Score,Part,Measure]"""
     if isinstance(stream, m21.stream.Score):
@@ -667,70 +803,128 @@ def expected_stream_constituent_type(stream):
         raise TypeError("The stream in input is neither Score, Part or Measure")
 
 
+def _remove_elements(stream, elements):
+    """Remove a list of elements from a stream in a single pass.
+
+    Stream.remove() searches the index of each element, so removing n elements from a stream is quadratic.
+    """
+    ids = set(id(e) for e in elements)
+    stream._elements = [e for e in stream._elements if id(e) not in ids]
+    stream._endElements = [e for e in stream._endElements if id(e) not in ids]
+    for e in elements:
+        stream._offsetDict.pop(id(e), None)
+        e.sites.remove(stream)
+        e.activeSite = None
+    stream.coreElementsChanged(clearIsSorted=False)
+
+
 def reconstruct(stream):
     """ This function ensures that the score is systematically of the structure : Score -> Part -> Measure -> Voice
-    It recursively goes through the whole score, if the type of stream is not as expected,
+    It goes through the whole score, if the type of stream is not as expected,
     a new stream is inserted.
+    The misplaced elements of each stream are moved in a single batch, and the hierarchy is visited
+    with an explicit stack, so the cost is linear in the number of elements.
 
     Args: stream (m21.stream) : a stream of m21 objects
 
     """
-    # exit condition for the reconstruct
-    if isinstance(stream, (m21.stream.Voice, m21.note.GeneralNote)):
-        return
-
-    empty = True
-    # determine the expected type of stream, depending on the current stream
-    expected_type = expected_stream_constituent_type(stream)
-
-    # iterate through only Streams and Notes, this ensures everything else stays in the right place
-    iterator = stream.getElementsByClass([m21.stream.Stream, m21.note.GeneralNote])
-    new_stream = expected_type()
-
-    # if the item in the iterator is not of the expexted type :
-    # it is added to temporary stream, from which the new node will be initialized
-    for item in iterator:
-        if not isinstance(item, expected_type):
-            empty = False
-            new_stream.append(item)
-            stream.remove(item)
-        reconstruct(item)
+    to_visit = [stream]
+    while len(to_visit) > 0:
+        stream = to_visit.pop()
+        # exit condition for the reconstruct
+        if isinstance(stream, (m21.stream.Voice, m21.note.GeneralNote)):
+            continue
+
+        # determine the expected type of stream, depending on the current stream
+        expected_type = expected_stream_constituent_type(stream)
+
+        # iterate through only Streams and Notes, this ensures everything else stays in the right place
+        items = list(
+            stream.getElementsByClass([m21.stream.Stream, m21.note.GeneralNote])
+        )
+        # the items not of the expected type are moved to a new stream, inserted in place of the gap
+        misplaced = [item for item in items if not isinstance(item, expected_type)]
+        to_visit.extend(item for item in items if isinstance(item, expected_type))
 
-    # if a gap was found, add the new_stream to the stream
-    if not empty:
-        stream.append(new_stream)
-        # the new node must be also reconstructed in case there's more than one gap
-        # (for ex: a score with only notes)
-        reconstruct(new_stream)
+        # if a gap was found, add the new_stream to the stream
+        if len(misplaced) > 0:
+            new_stream = expected_type()
+            _remove_elements(stream, misplaced)
+            new_stream.append(misplaced)
+            stream.append(new_stream)
+            # the new node must be also reconstructed in case there's more than one gap
+            # (for ex: a score with only notes)
+            to_visit.append(new_stream)
 
 
 class Voice(m21.stream.Voice):
     """The voice class. It contains all the information and methods from m21 voice, but also beaming trees and tuplet trees.
     """
 
-    def __init__(self, stream, consider_grace_notes: bool = False):
+    def __init__(
+        self, stream, consider_grace_notes: bool = False, notation_trees=None
+    ):
+        """Initialize the voice from a music21 voice.
+
+        Args:
+            stream (m21.stream.Voice): the music21 voice
+            consider_grace_notes (bool, optional): consider or not grace notes in the notation trees. Defaults to False.
+            notation_trees (tuple, optional): the couple (BT, TT) if it is already computed. Defaults to None.
+        """
         m21.stream.Voice.__init__(self, stream, id=stream.id)
-        self.beaming_tree = m21_2_notationtree(
-            [e for e in stream], "beamings", consider_grace_notes
-        )
-        self.tuplet_tree = m21_2_notationtree(
-            [e for e in stream], "tuplets", consider_grace_notes
-        )
+        if notation_trees is None:
+            notation_trees = m21_2_notationtrees(
+                [e for e in stream], consider_grace_notes
+            )
+        self.beaming_tree, self.tuplet_tree = notation_trees
 
 
-def score_notation_tree(score):
-    """Replaces the voices with score model voices"""
-    for el in score.recurse():
-        if isinstance(el, m21.stream.Voice):
-            print(el)
-            new_voice = Voice(el)
-            score.replace(el, new_voice, recurse=True)
+def score_notation_tree(
+    score, consider_grace_notes: bool = False, n_workers: int = 1
+):
+    """Replaces the voices with score model voices.
 
+    All the voices are collected with their parent stream in a single pass, then each voice is replaced
+    directly in its parent, instead of searching it again in the whole score.
 
-def add_nt_to_score(score):
-    """Takes any m21 score, reorganizes it, and compute notation trees"""
+    Args:
+        score (m21.stream.Stream): the score
+        consider_grace_notes (bool, optional): consider or not grace notes in the notation trees. Defaults to False.
+        n_workers (int, optional): the number of processes used to build the trees. 
+            1 builds the trees in this process, None uses all the cores. Defaults to 1.
+    """
+    voices = [
+        (container, voice)
+        for container in score.recurse(streamsOnly=True, includeSelf=True)
+        for voice in container.getElementsByClass(m21.stream.Voice)
+    ]
+
+    descriptors = [
+        m21_2_notation_descriptors([e for e in voice], consider_grace_notes)
+        for _, voice in voices
+    ]
+    if n_workers == 1:
+        trees = [_notation_descriptors2trees(d) for d in descriptors]
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            trees = list(
+                executor.map(_notation_descriptors2trees, descriptors, chunksize=16)
+            )
+
+    for (container, voice), notation_trees in zip(voices, trees):
+        new_voice = Voice(voice, consider_grace_notes, notation_trees)
+        container.replace(voice, new_voice)
+
+
+def add_nt_to_score(score, n_workers: int = 1):
+    """Takes any m21 score, reorganizes it, and compute notation trees
+
+    Args:
+        score (m21.stream.Stream): the score
+        n_workers (int, optional): the number of processes used to build the trees. Defaults to 1.
+    """
     reconstruct(score)
-    score_notation_tree(score)
+    score_notation_tree(score, n_workers=n_workers)
     _test_add_nt_to_score(score)
     return score
 
@@ -1,16 +1,31 @@
 from typing import List
 import numpy as np
+import bisect
 from fractions import Fraction
 from .constant import CONTINUATION_SYMBOL, REST_SYMBOL
 import numbers
+import math
+import json
 import pretty_midi as pm
 
+TIMELINE_BACKENDS = ("object", "columnar")
+# float timestamps are approximated with this maximum denominator in the columnar backend
+MAX_DENOMINATOR = 10 ** 6
+
 
 class Event:
+    __slots__ = ("timestamp", "musical_artifact")  # no __dict__, events are created in large numbers
+
     def __init__(self, timestamp, musical_artifact):
         self.timestamp = timestamp
         self.musical_artifact = musical_artifact
 
+    def __getstate__(self):  # needed by the pickle protocols 0 and 1 with __slots__
+        return (self.timestamp, self.musical_artifact)
+
+    def __setstate__(self, state):
+        self.timestamp, self.musical_artifact = state
+
     def __add__(self, number: numbers.Number):
         return Event(self.timestamp + number, self.musical_artifact)
 
@@ -36,29 +51,244 @@ class Event:
         return str((self.timestamp, self.musical_artifact))
 
 
+class ArtifactDictionary:
+    """Store each distinct musical artifact once, and identify it with a small integer code.
+
+    The columnar timelines keep the codes of their musical artifacts in an int32 column and share the dictionary
+    with the timelines derived from them (split, shift_and_rescale, add). Dictionaries only grow, so the codes stay valid.
+    Artifacts with different container types (e.g. [60] and (60,)) have different codes. The dictionary stores
+    a copy of each artifact and decoding returns new copies, so modifying a decoded artifact does not change the others.
+    """
+
+    def __init__(self):
+        self._artifacts = []  # the musical artifact of each code
+        self._codes = {}  # the code of each (hashable) musical artifact
+
+    def __len__(self):
+        return len(self._artifacts)
+
+    def encode(self, musical_artifact) -> int:
+        """Return the code of a musical artifact, adding it to the dictionary if it is new."""
+        key = _freeze(musical_artifact)
+        code = self._codes.get(key)
+        if code is None:
+            code = len(self._artifacts)
+            self._codes[key] = code
+            self._artifacts.append(_copy_artifact(musical_artifact))
+        return code
+
+    def encode_all(self, musical_artifacts) -> np.ndarray:
+        """Return the int32 array with the codes of a list of musical artifacts."""
+        return np.array([self.encode(a) for a in musical_artifacts], dtype=np.int32)
+
+    def decode(self, code: int):
+        return _copy_artifact(self._artifacts[code])
+
+    def decode_all(self, codes) -> list:
+        """Return the list of musical artifacts of an array of codes."""
+        return [_copy_artifact(self._artifacts[c]) for c in np.asarray(codes).tolist()]
+
+    def translate(self, codes, other: "ArtifactDictionary") -> np.ndarray:
+        """Convert codes of another dictionary in codes of this dictionary."""
+        if other is self:
+            return codes
+        # encode only the artifacts that are used, not the whole other dictionary
+        unique_codes, inverse = np.unique(np.asarray(codes), return_inverse=True)
+        lookup = np.array(
+            [self.encode(other._artifacts[c]) for c in unique_codes.tolist()],
+            dtype=np.int32,
+        )
+        return lookup[inverse.reshape(-1)]
+
+
+def _freeze(musical_artifact):
+    """Return a hashable version of a musical artifact (containers become tuples that start with their type)."""
+    if isinstance(musical_artifact, (list, tuple, np.ndarray)):
+        return (type(musical_artifact),) + tuple(_freeze(a) for a in musical_artifact)
+    else:
+        return musical_artifact
+
+
+def _copy_artifact(musical_artifact):
+    """Return a copy of a musical artifact, with new containers of the same types."""
+    if isinstance(musical_artifact, list):
+        return [_copy_artifact(a) for a in musical_artifact]
+    elif isinstance(musical_artifact, tuple):
+        return tuple(_copy_artifact(a) for a in musical_artifact)
+    elif isinstance(musical_artifact, np.ndarray):
+        return musical_artifact.copy()
+    else:
+        return musical_artifact
+
+
 class Timeline:
     def __init__(
-        self, events, start=0, end=1, auto_sort=False,
+        self, events, start=0, end=1, auto_sort=False, backend="object",
     ):
+        """Initialize a timeline from a list of events in the interval [start,end[.
+
+        Two storage backends are available. The "object" backend keeps a numpy array of Event objects.
+        Affine transforms of the timestamps (e.g. shift_and_rescale) are recorded on object timelines and composed,
+        and the new Event objects are created only when the events are read.
+        The "columnar" backend keeps the timestamps as int64 ticks over a common resolution,
+        and the codes of the musical artifacts in an ArtifactDictionary in a separate column,
+        so that split, shift_and_rescale and add are vectorized and each distinct artifact is stored once.
+        WARNING: the columnar backend stores exact rationals, float timestamps are converted to Fractions.
+
+        Args:
+            events (list): the list of Event objects
+            start (number, optional): the beginning of the interval. Defaults to 0.
+            end (number, optional): the end of the interval. Defaults to 1.
+            auto_sort (bool, optional): sort the events by timestamp. Defaults to False.
+            backend (str, optional): either "object" or "columnar". Defaults to "object".
+
+        Raises:
+            TypeError: if backend is invalid
+        """
+        if backend not in TIMELINE_BACKENDS:
+            raise TypeError(
+                backend,
+                "is not a valid backend. backend must be either 'object' or 'columnar'",
+            )
         if auto_sort:  # sort if requested
             events = sorted(events)
-        if (
-            len(events) == 0 or events[0].timestamp != start
-        ):  # if the first event does not happen on start
-            # add a continuation at the beginning
-            events = np.concatenate(([Event(start, CONTINUATION_SYMBOL)], events))
-        self.events = np.array(events)
+        self.backend = backend
         self.start = start
         self.end = end
+        self.events = events
+
+    @classmethod
+    def _lazy(cls, events, transform, start, end):
+        """Create an object timeline whose timestamps are the ones of events with a pending transform.
+
+        The array must not be shared with another timeline, so the callers pass a copy (that copies only the references).
+        The Event objects are shared with the source timeline until the transform is applied, when the events are read.
+
+        Args:
+            events (np.array): the Event objects, that already start with an event on the untransformed start
+            transform (tuple): the triple (shift_from, scale, shift_to) that maps t to (t - shift_from) * scale + shift_to
+            start (number): the beginning of the interval
+            end (number): the end of the interval
+        """
+        timeline = cls.__new__(cls)
+        timeline.backend = "object"
+        timeline.start = start
+        timeline.end = end
+        timeline._events = events
+        timeline._transform = transform
+        timeline._onsets = None
+        return timeline
+
+    @classmethod
+    def _from_columns(cls, ticks, resolution, artifacts, start, end):
+        """Create a columnar timeline directly from its columns, without building Event objects."""
+        dictionary = ArtifactDictionary()
+        return cls._from_codes(
+            ticks, resolution, dictionary.encode_all(artifacts), dictionary, start, end
+        )
+
+    @classmethod
+    def _from_codes(cls, ticks, resolution, codes, dictionary, start, end):
+        """Create a columnar timeline from its columns, with the musical artifacts encoded in dictionary."""
+        timeline = cls.__new__(cls)
+        timeline.backend = "columnar"
+        timeline.start = start
+        timeline.end = end
+        timeline._set_columns(ticks, resolution, codes, dictionary)
+        return timeline
+
+    @property
+    def events(self):
+        if self.backend == "object":
+            if self._transform is not None:  # apply the pending transform
+                shift_from, scale, shift_to = self._transform
+                self._events = (self._events - shift_from) * scale + shift_to
+                self._transform = None
+            return self._events
+        else:  # materialize the events from the columns
+            events = np.empty(len(self._ticks), dtype=object)
+            artifacts = self._dictionary.decode_all(self._codes)
+            for i, (t, a) in enumerate(zip(self._ticks, artifacts)):
+                events[i] = Event(Fraction(int(t), self._resolution), a)
+            return events
+
+    @events.setter
+    def events(self, events):
+        if self.backend == "object":
+            if (
+                len(events) == 0 or events[0].timestamp != self.start
+            ):  # if the first event does not happen on start
+                # add a continuation at the beginning
+                events = np.concatenate(
+                    ([Event(self.start, CONTINUATION_SYMBOL)], events)
+                )
+            self._events = np.array(events)
+            self._transform = None
+            self._onsets = None  # the cached sorted timestamps, see _bisect()
+        else:
+            ticks, resolution = _to_ticks([e.timestamp for e in events])
+            dictionary = ArtifactDictionary()
+            codes = dictionary.encode_all([e.musical_artifact for e in events])
+            self._set_columns(ticks, resolution, codes, dictionary)
+
+    def _set_columns(self, ticks, resolution, codes, dictionary):
+        """Set the columns of a columnar timeline, adding the initial continuation and reducing the resolution."""
+        # start and end must be integer ticks too
+        new_resolution = _lcm(
+            resolution,
+            _lcm(
+                _as_fraction(self.start).denominator,
+                _as_fraction(self.end).denominator,
+            ),
+        )
+        ticks = np.asarray(ticks, dtype=np.int64) * (new_resolution // resolution)
+        resolution = new_resolution
+        start_tick = _tick(self.start, resolution)
+        if len(ticks) == 0 or ticks[0] != start_tick:
+            # add a continuation at the beginning
+            ticks = np.concatenate(([start_tick], ticks)).astype(np.int64)
+            codes = np.concatenate(
+                ([dictionary.encode(CONTINUATION_SYMBOL)], codes)
+            ).astype(np.int32)
+        # keep the smallest resolution, so that equal timelines have equal columns
+        divisor = math.gcd(int(np.gcd.reduce(ticks)), resolution)
+        divisor = math.gcd(divisor, _tick(self.end, resolution))
+        self._ticks = ticks // divisor
+        self._resolution = resolution // divisor
+        self._codes = np.asarray(codes, dtype=np.int32)
+        self._dictionary = dictionary
+
+    def _columns(self):
+        """Return the timestamps as (ticks, resolution) and the musical artifacts column, for any backend."""
+        ticks, resolution = self._tick_column()
+        return ticks, resolution, _to_object_array(self.get_musical_artifacts())
+
+    def _tick_column(self):
+        """Return the timestamps as (ticks, resolution) for any backend, without decoding the musical artifacts."""
+        if self.backend == "columnar":
+            return self._ticks, self._resolution
+        return _to_ticks(self.get_timestamps())
 
     def get_timestamps(self):
+        if self.backend == "columnar":
+            return [Fraction(int(t), self._resolution) for t in self._ticks]
         return [e.timestamp for e in self.events]
 
     def get_musical_artifacts(self):
+        if self.backend == "columnar":
+            return self._dictionary.decode_all(self._codes)
         return [e.musical_artifact for e in self.events]
 
+    def _encode(self, dictionary: ArtifactDictionary) -> np.ndarray:
+        """Return the codes of the musical artifacts in dictionary, adding the missing ones."""
+        if self.backend == "columnar":
+            return dictionary.translate(self._codes, self._dictionary)
+        return dictionary.encode_all(self.get_musical_artifacts())
+
     def __len__(self):
-        return len(self.events)
+        if self.backend == "columnar":
+            return len(self._ticks)
+        return len(self._events)  # the transforms do not change the number of events
 
     def __repr__(self):
         return "Tim{},[{},{}[".format(self.events, self.start, self.end)
@@ -66,6 +296,21 @@ class Timeline:
     def __eq__(self, other):
         if not isinstance(other, Timeline):
             return False
+        elif self.backend == "columnar" and other.backend == "columnar":
+            # columns are always reduced, so equal timelines have equal columns
+            if not (
+                self._resolution == other._resolution
+                and np.array_equal(self._ticks, other._ticks)
+                and self.start == other.start
+                and self.end == other.end
+            ):
+                return False
+            elif self._dictionary is other._dictionary:
+                return np.array_equal(self._codes, other._codes)
+            return np.array_equal(
+                _to_object_array(self.get_musical_artifacts()),
+                _to_object_array(other.get_musical_artifacts()),
+            )
         else:
             return (
                 np.array_equal(self.events, other.events)
@@ -75,6 +320,20 @@ class Timeline:
 
     def __add__(self, other):
         shifted_other = other.shift_and_rescale(new_start=self.end)
+        if self.backend == "columnar":
+            ticks1, res1 = self._ticks, self._resolution
+            ticks2, res2 = shifted_other._tick_column()
+            resolution = _lcm(res1, res2)
+            return Timeline._from_codes(
+                np.concatenate(
+                    [ticks1 * (resolution // res1), ticks2 * (resolution // res2)]
+                ),
+                resolution,
+                np.concatenate([self._codes, shifted_other._encode(self._dictionary)]),
+                self._dictionary,
+                start=self.start,
+                end=shifted_other.end,
+            )
         return Timeline(
             np.concatenate([self.events, shifted_other.events]),
             start=self.start,
@@ -82,6 +341,8 @@ class Timeline:
         )
 
     def split(self, k: int, normalize: bool = False):
+        if self.backend == "columnar":
+            return self._split_columnar(k, normalize)
         # compute the split points
         split_points = [
             Fraction(i, k) * Fraction((self.end - self.start)) + Fraction(self.start)
@@ -93,8 +354,13 @@ class Timeline:
         ]
         # split the events according to those indices (and normalize if required)
         return [
-            Timeline(
-                (self.events[ind[0] : ind[1]] - split_points[i]) * k + self.start,
+            Timeline._lazy(
+                Timeline(
+                    self.events[ind[0] : ind[1]],
+                    start=split_points[i],
+                    end=split_points[i + 1],
+                )._events,
+                (split_points[i], k, self.start),
                 start=self.start,
                 end=self.end,
             )
@@ -107,6 +373,41 @@ class Timeline:
             for i, ind in enumerate(zip(split_indices[:-1], split_indices[1:]))
         ]
 
+    def _split_columnar(self, k: int, normalize: bool):
+        """Vectorized version of split() for the columnar backend."""
+        # multiply the resolution by k so that all split points are integer ticks
+        resolution = self._resolution * k
+        ticks = self._ticks * k
+        start_tick = _tick(self.start, resolution)
+        length = _tick(self.end, resolution) - start_tick
+        split_points = start_tick + np.arange(k + 1, dtype=np.int64) * (length // k)
+        split_indices = np.searchsorted(ticks, split_points)
+        out = []
+        for i, (i0, i1) in enumerate(zip(split_indices[:-1], split_indices[1:])):
+            if normalize:
+                out.append(
+                    Timeline._from_codes(
+                        (ticks[i0:i1] - split_points[i]) * k + start_tick,
+                        resolution,
+                        self._codes[i0:i1],
+                        self._dictionary,
+                        start=self.start,
+                        end=self.end,
+                    )
+                )
+            else:
+                out.append(
+                    Timeline._from_codes(
+                        ticks[i0:i1],
+                        resolution,
+                        self._codes[i0:i1],
+                        self._dictionary,
+                        start=Fraction(int(split_points[i]), resolution),
+                        end=Fraction(int(split_points[i + 1]), resolution),
+                    )
+                )
+        return out
+
     def shift_and_rescale(self, new_start=None, new_end=None):
         # if new_start and new end are not provided, default to 0 and 1
         if new_start is None and new_end is None:
@@ -121,14 +422,190 @@ class Timeline:
         # if only new end is defined, exception
         else:
             raise Exception("you must define new_end if you define new_start")
-        return Timeline(
-            (self.events - self.start)
-            * Fraction(new_end - new_start, self.end - self.start)
-            + new_start,
-            start=new_start,
-            end=new_end,
+        if self.backend == "columnar":
+            scale = _as_fraction(new_end - new_start) / _as_fraction(
+                self.end - self.start
+            )
+            # choose a resolution where both the rescaled ticks and new_start are integers
+            resolution = _lcm(
+                self._resolution * scale.denominator,
+                _as_fraction(new_start).denominator,
+            )
+            factor = scale.numerator * (
+                resolution // (self._resolution * scale.denominator)
+            )
+            return Timeline._from_codes(
+                (self._ticks - _tick(self.start, self._resolution)) * factor
+                + _tick(new_start, resolution),
+                resolution,
+                self._codes,
+                self._dictionary,
+                start=new_start,
+                end=new_end,
+            )
+        scale = Fraction(new_end - new_start, self.end - self.start)
+        if self._transform is None:
+            transform = (self.start, scale, new_start)
+        elif self._transform[1] == 0 or not all(
+            isinstance(x, numbers.Rational) for x in self._transform
+        ):  # the transforms can not be composed exactly, apply the pending one
+            return Timeline._lazy(
+                self.events.copy(), (self.start, scale, new_start), new_start, new_end
+            )
+        else:
+            # t -> ((t - a1) * s1 + b1 - a2) * s2 + b2 = (t - (a1 + (a2 - b1) / s1)) * s1 * s2 + b2
+            a1, s1, b1 = self._transform
+            transform = (a1 + Fraction(self.start - b1) / s1, s1 * scale, new_start)
+        return Timeline._lazy(self._events.copy(), transform, new_start, new_end)
+
+    def view(self):
+        """Return a TimelineView of the whole timeline, to split it without copying the events."""
+        if self.backend == "columnar":
+            dictionary = self._dictionary
+        else:
+            dictionary = ArtifactDictionary()
+        return TimelineView(
+            self.get_timestamps(),
+            self._encode(dictionary).tolist(),
+            dictionary,
+            0,
+            len(self),
+            (self.start, self.end),
+            False,
+            self.start,
+            self.end,
         )
 
+    def _bisect(self, t, side: str) -> int:
+        """Return the number of events with timestamp < t (side "left") or <= t (side "right").
+
+        It is a binary search on the ticks for the columnar backend, and on the timestamps for the object backend,
+        that are cached the first time. WARNING: the cache is not invalidated if the events are modified directly.
+        """
+        if self.backend == "columnar":
+            tick = _as_fraction(t) * self._resolution
+            tick = math.ceil(tick) if side == "left" else math.floor(tick)
+            return int(np.searchsorted(self._ticks, tick, side=side))
+        if self._onsets is None:
+            self._onsets = self.get_timestamps()
+        if side == "left":
+            return bisect.bisect_left(self._onsets, t)
+        return bisect.bisect_right(self._onsets, t)
+
+    def _event(self, index: int) -> Event:
+        """Return a single event, without materializing all the events of a columnar timeline."""
+        if self.backend == "columnar":
+            return Event(
+                Fraction(int(self._ticks[index]), self._resolution),
+                self._dictionary.decode(int(self._codes[index])),
+            )
+        return self.events[index]
+
+    def index_at(self, t):
+        """Return the index of the event sounding at time t (stabbing query), in logarithmic time.
+
+        Each event lasts from its timestamp to the timestamp of the next event (or to the end of the timeline).
+
+        Args:
+            t (number): the time
+
+        Returns:
+            int: the index of the event, or None if t is not in [start,end[
+        """
+        if not self.start <= t < self.end:
+            return None
+        return self._bisect(t, "right") - 1
+
+    def event_at(self, t):
+        """Return the event sounding at time t, or None if t is not in [start,end[. See index_at()."""
+        index = self.index_at(t)
+        return None if index is None else self._event(index)
+
+    def window_indices(self, window_start, window_end, overlap: bool = True):
+        """Return the indices of the events in the window [window_start,window_end[ (range query), in logarithmic time.
+
+        Args:
+            window_start (number): the beginning of the window
+            window_end (number): the end of the window
+            overlap (bool, optional): if True, consider all the events that sound in the window,
+                also the one that starts before window_start. If False, only the events with the timestamp in the window.
+                Defaults to True.
+
+        Returns:
+            couple: (lo, hi), the events in the window are the ones with index in [lo, hi[
+        """
+        window_start = max(window_start, self.start)
+        window_end = min(window_end, self.end)
+        if window_start >= window_end:
+            return 0, 0
+        if overlap:
+            # the last event that starts before window_start, or all the events on window_start
+            lo = min(
+                self._bisect(window_start, "left"),
+                self._bisect(window_start, "right") - 1,
+            )
+        else:
+            lo = self._bisect(window_start, "left")
+        return lo, self._bisect(window_end, "left")
+
+    def events_in(self, window_start, window_end, overlap: bool = True) -> List[Event]:
+        """Return the list of events in the window [window_start,window_end[. See window_indices()."""
+        lo, hi = self.window_indices(window_start, window_end, overlap)
+        return [self._event(i) for i in range(lo, hi)]
+
+    def _json_times(self, time_type: str):
+        """Compute the onsets or the durations of the events as exact fractions, with vectorized operations.
+
+        Args:
+            time_type (str): either "onset"or "duration"
+
+        Raises:
+            TypeError: if time_type is invalid
+
+        Returns:
+            couple: (numerators, denominators), two lists of int with the reduced fractions.
+        """
+        if time_type not in ("onset", "duration"):
+            raise TypeError(
+                time_type,
+                "is not a valid type. time_type must be either 'onset' or 'duration'",
+            )
+        if self.backend == "columnar":
+            ticks, resolution = self._ticks, self._resolution
+            timestamps = None
+        else:
+            timestamps = self.get_timestamps()
+            try:
+                ticks, resolution = _to_ticks([Fraction(t) for t in timestamps])
+            except OverflowError:  # the common resolution does not fit in int64
+                ticks = None
+        if time_type == "duration" and ticks is not None:
+            # float arithmetic gives different durations than the exact one
+            if isinstance(self.end, float) or (
+                timestamps is not None and any(isinstance(t, float) for t in timestamps)
+            ):
+                ticks = None
+            else:
+                try:
+                    ticks = np.diff(np.append(ticks, _tick(self.end, resolution)))
+                except (OverflowError, ValueError):  # the end is not on the grid
+                    ticks = None
+        if ticks is not None:
+            try:
+                divisors = np.gcd(ticks, resolution)
+                return (ticks // divisors).tolist(), (resolution // divisors).tolist()
+            except OverflowError:
+                pass
+        if timestamps is None:
+            timestamps = self.get_timestamps()
+        if time_type == "duration":
+            times = [
+                Fraction(of - on) for on, of in zip(timestamps, timestamps[1:] + [self.end])
+            ]
+        else:
+            times = [Fraction(t) for t in timestamps]
+        return [t.numerator for t in times], [t.denominator for t in times]
+
     def to_json(self, time_type: str) -> List[dict]:
         """Generates a list of dictionaries representation of a timeline. One dict for each event.
 
@@ -141,48 +618,261 @@ class Timeline:
         Returns:
             list(dict): A list of dictionaries describing the events in the timeline.
         """
-        event_list = []
-        if time_type == "onset":
-            for event in self.events:
-                musical_artif = (  # to avoid the numpy array for the json encoding
-                    event.musical_artifact
-                    if event.musical_artifact == REST_SYMBOL
-                    else list(event.musical_artifact)
-                )
-                event_list.append(
-                    {
-                        "onset": {
-                            "numerator": int(Fraction(event.timestamp).numerator),
-                            "denominator": int(Fraction(event.timestamp).denominator),
-                        },
-                        "musical_artifact": musical_artif,
-                    }
-                )
-            return event_list
-        if time_type == "duration":
-            onsets = [e.timestamp for e in self.events]
-            durations = [of - on for on, of in zip(onsets, onsets[1:] + [self.end])]
-            for ie, event in enumerate(self.events):
-                musical_artif = (  # to avoid the numpy array for the json encoding
-                    event.musical_artifact
-                    if event.musical_artifact == REST_SYMBOL
-                    else list(event.musical_artifact)
-                )
-                event_list.append(
-                    {
-                        "duration": {
-                            "numerator": int(Fraction(durations[ie]).numerator),
-                            "denominator": int(Fraction(durations[ie]).denominator),
-                        },
-                        "musical_artifact": musical_artif,
-                    }
+        numerators, denominators = self._json_times(time_type)
+        return [
+            {
+                time_type: {"numerator": n, "denominator": d},
+                "musical_artifact": _json_artifact(a),
+            }
+            for n, d, a in zip(numerators, denominators, self.get_musical_artifacts())
+        ]
+
+    def write_json(self, fp, time_type: str):
+        """Write the JSON encoding of to_json() in a binary file object, without building the dictionaries.
+
+        Args:
+            fp (file): a binary file object, e.g. io.BytesIO or a file opened with "wb"
+            time_type (str): either "onset"or "duration"
+
+        Raises:
+            TypeError: if time_type is invalid
+        """
+        numerators, denominators = self._json_times(time_type)
+        template = '{{"' + time_type + '": {{"numerator": {}, "denominator": {}}}, "musical_artifact": {}}}'
+        items = [
+            template.format(n, d, json.dumps(_json_artifact(a)))
+            for n, d, a in zip(numerators, denominators, self.get_musical_artifacts())
+        ]
+        fp.write(("[" + ", ".join(items) + "]").encode())
+
+
+def _json_artifact(musical_artifact):
+    """Return a musical artifact that can be encoded in JSON (to avoid the numpy arrays)."""
+    if musical_artifact == REST_SYMBOL:
+        return musical_artifact
+    return list(musical_artifact)
+
+
+class TimelineBuilder:
+    """Concatenate timelines one after the other, as repeated Timeline additions, but in linear time.
+
+    The appended timelines are only recorded with their new start, and the final Timeline is built in one pass.
+    The result has the start and the backend of the first appended timeline.
+    """
+
+    def __init__(self):
+        self._timelines = []  # the appended timelines with their new start
+        self.start = None
+        self.end = None
+
+    def __len__(self):
+        return len(self._timelines)
+
+    def append(self, timeline: Timeline):
+        """Append a timeline after the ones already appended.
+
+        Args:
+            timeline (Timeline): the timeline to append
+
+        Returns:
+            TimelineBuilder: the builder itself, so that calls can be chained
+        """
+        if len(self._timelines) == 0:
+            self.start = timeline.start
+            self.end = timeline.start
+        self._timelines.append((timeline, self.end))
+        self.end = self.end + (timeline.end - timeline.start)
+        return self
+
+    def __iadd__(self, timeline: Timeline):
+        return self.append(timeline)
+
+    def build(self) -> Timeline:
+        """Create the concatenated Timeline.
+
+        Raises:
+            TypeError: if no timeline has been appended
+
+        Returns:
+            Timeline: the same timeline given by the sum of the appended timelines.
+        """
+        if len(self._timelines) == 0:
+            raise TypeError("No timeline has been appended")
+        first = self._timelines[0][0]
+        shifted = [first] + [
+            t.shift_and_rescale(new_start=new_start)
+            for t, new_start in self._timelines[1:]
+        ]
+        if first.backend == "columnar":
+            columns = [t._tick_column() for t in shifted]
+            resolution = 1
+            for _, res in columns:
+                resolution = _lcm(resolution, res)
+            return Timeline._from_codes(
+                np.concatenate([ticks * (resolution // res) for ticks, res in columns]),
+                resolution,
+                np.concatenate([t._encode(first._dictionary) for t in shifted]),
+                first._dictionary,
+                start=self.start,
+                end=shifted[-1].end,
+            )
+        return Timeline(
+            np.concatenate([t.events for t in shifted]),
+            start=self.start,
+            end=shifted[-1].end,
+        )
+
+
+class TimelineView:
+    """A read-only sub-timeline that shares the timestamps and the musical artifacts of another timeline.
+
+    A view contains the events with index in [lo, hi[ of the shared lists, that lie in the interval
+    [base_start, base_end[ of the original timeline. Their timestamps are mapped linearly in [start, end[
+    only when they are read. If no event is on base_start, the view starts with a continuation, as Timeline does.
+    Splitting a view gives other views, so the recursive splits do not copy the events.
+    """
+
+    def __init__(
+        self, timestamps, codes, dictionary, lo, hi, base_interval, lead, start, end
+    ):
+        """Initialize a view. Use Timeline.view() to create the view of a whole timeline.
+
+        Args:
+            timestamps (list): the sorted timestamps of the original timeline, shared between views
+            codes (list): the codes of the musical artifacts of the original timeline, shared between views
+            dictionary (ArtifactDictionary): the dictionary of the codes
+            lo (int): the index of the first event of the view
+            hi (int): the index after the last event of the view
+            base_interval (tuple): the interval (base_start, base_end) of the view in the original timeline
+            lead (bool): if the view starts with a continuation that is not in the original timeline
+            start (number): the beginning of the interval of the view
+            end (number): the end of the interval of the view
+        """
+        self._timestamps = timestamps
+        self._codes = codes
+        self._dictionary = dictionary
+        self._lo = lo
+        self._hi = hi
+        self._base_start, self._base_end = base_interval
+        self._lead = lead
+        self.start = start
+        self.end = end
+
+    def __len__(self):
+        return self._hi - self._lo + (1 if self._lead else 0)
+
+    def __repr__(self):
+        return "View{},[{},{}[".format(self.events, self.start, self.end)
+
+    def get_timestamps(self):
+        scale = Fraction(self.end - self.start) / Fraction(
+            self._base_end - self._base_start
+        )
+        timestamps = [
+            (t - self._base_start) * scale + self.start
+            for t in self._timestamps[self._lo : self._hi]
+        ]
+        return [self.start] + timestamps if self._lead else timestamps
+
+    def get_musical_artifacts(self):
+        artifacts = self._dictionary.decode_all(self._codes[self._lo : self._hi])
+        return [CONTINUATION_SYMBOL] + artifacts if self._lead else artifacts
+
+    def get_artifact_codes(self) -> tuple:
+        """Return the codes of the musical artifacts, so that views can be compared without decoding them."""
+        codes = tuple(self._codes[self._lo : self._hi])
+        return (self._dictionary.encode(CONTINUATION_SYMBOL),) + codes if self._lead else codes
+
+    @property
+    def events(self):
+        return _to_object_array(
+            [
+                Event(t, a)
+                for t, a in zip(self.get_timestamps(), self.get_musical_artifacts())
+            ]
+        )
+
+    def to_timeline(self, backend="object") -> Timeline:
+        """Create a Timeline with a copy of the events of the view."""
+        return Timeline(self.events, start=self.start, end=self.end, backend=backend)
+
+    def split(self, k: int, normalize: bool = False):
+        """Split the view in k views of equal duration, as Timeline.split()."""
+        base_length = Fraction(self._base_end - self._base_start)
+        length = Fraction(self.end - self.start)
+        out = []
+        lo = self._lo
+        for i in range(k):
+            base_start = self._base_start + base_length * Fraction(i, k)
+            base_end = self._base_start + base_length * Fraction(i + 1, k)
+            hi = bisect.bisect_left(self._timestamps, base_end, lo, self._hi)
+            lead = lo == hi or self._timestamps[lo] != base_start
+            if normalize:
+                start, end = self.start, self.end
+            else:
+                start = self.start + length * Fraction(i, k)
+                end = self.start + length * Fraction(i + 1, k)
+            out.append(
+                TimelineView(
+                    self._timestamps,
+                    self._codes,
+                    self._dictionary,
+                    lo,
+                    hi,
+                    (base_start, base_end),
+                    lead,
+                    start,
+                    end,
                 )
-            return event_list
-        else:
-            raise TypeError(
-                time_type,
-                "is not a valid type. time_type must be either 'onset' or 'duration'",
             )
+            lo = hi
+        return out
+
+
+def _as_fraction(value):
+    """Convert a number to a Fraction, approximating floats to avoid huge denominators."""
+    if isinstance(value, float):
+        return Fraction(value).limit_denominator(MAX_DENOMINATOR)
+    else:
+        return Fraction(value)
+
+
+def _lcm(a: int, b: int) -> int:
+    """Return the least common multiple of two positive integers."""
+    return a * b // math.gcd(a, b)
+
+
+def _tick(value, resolution: int) -> int:
+    """Convert a number to an integer number of ticks of size 1/resolution."""
+    tick = _as_fraction(value) * resolution
+    if tick.denominator != 1:
+        raise ValueError(value, "is not representable with resolution", resolution)
+    return tick.numerator
+
+
+def _to_ticks(values):
+    """Convert a list of numbers to an int64 array of ticks over their common resolution.
+
+    Returns:
+        couple: (ticks, resolution)
+    """
+    fractions = [_as_fraction(v) for v in values]
+    resolution = 1
+    for f in fractions:
+        resolution = _lcm(resolution, f.denominator)
+    ticks = np.array(
+        [f.numerator * (resolution // f.denominator) for f in fractions],
+        dtype=np.int64,
+    )
+    return ticks, resolution
+
+
+def _to_object_array(values):
+    """Create a 1-dimensional numpy object array, also if the elements are lists of different lengths."""
+    out = np.empty(len(values), dtype=object)
+    for i, v in enumerate(values):
+        out[i] = v
+    return out
 
 
 def split_content(seq, k: int, interval=(0, 1)):
@@ -239,3 +929,12 @@ class MusicalContent:
     def to_json(self, time_type: str) -> dict:
         return {"voices": [t.to_json(time_type) for t in self.timelines]}
 
+    def write_json(self, fp, time_type: str):
+        """Write the JSON encoding of to_json() in a binary file object, one voice at a time."""
+        fp.write(b'{"voices": [')
+        for i, t in enumerate(self.timelines):
+            if i > 0:
+                fp.write(b", ")
+            t.write_json(fp, time_type)
+        fp.write(b"]}")
+
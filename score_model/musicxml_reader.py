@@ -0,0 +1,746 @@
+"""A light reader of MusicXML files, that does not build the music21 object model.
+
+The functions in m21utils only need a few descriptors for each general note (offset, duration type, dots,
+pitches, accidentals, ties, beams, tuplets and grace). This module extracts them directly from the XML file,
+with an incremental parser, and it follows the conventions of the music21 MusicXML import
+(followed by m21utils.reconstruct()), so that labels, sequential structures, timelines and notation trees
+are the same as the ones produced from the music21 score.
+"""
+import copy
+import math
+import xml.etree.ElementTree as ET
+from fractions import Fraction
+from typing import Iterable
+
+import music21 as m21
+
+from .bar_trees import NotationTree, timeline2rt
+from .constant import REST_SYMBOL
+from .m21utils import correct_tuplet, seq_struct2notationtree, _correct_beamings
+from .music_sequences import Event, Timeline
+
+# alteration of the accidental names in MusicXML
+ACCIDENTAL_ALTERS = {
+    "sharp": 1,
+    "natural": 0,
+    "flat": -1,
+    "double-sharp": 2,
+    "sharp-sharp": 2,
+    "flat-flat": -2,
+    "double-flat": -2,
+    "natural-sharp": 1,
+    "natural-flat": -1,
+    "quarter-flat": -0.5,
+    "quarter-sharp": 0.5,
+    "three-quarters-flat": -1.5,
+    "three-quarters-sharp": 1.5,
+    "triple-sharp": 3,
+    "triple-flat": -3,
+}
+
+STEP_PITCH_CLASSES = {"C": 0, "D": 2, "E": 4, "F": 5, "G": 7, "A": 9, "B": 11}
+
+
+class XMLGeneralNote:
+    """The descriptors of a note, a rest or a chord read from a MusicXML file.
+
+    Attributes:
+        offset (Fraction): the offset in quarter notes from the beginning of the voice
+        quarter_length (Fraction): the duration in quarter notes (0 for grace notes)
+        type (str): the music21 duration type, e.g. "quarter" or "16th"
+        dots (int): the number of dots
+        is_grace (bool): if it is a grace note
+        is_rest (bool): if it is a rest
+        pitches (list): one dictionary for each note (in the XML order), with keys "step", "octave",
+            "alter" (float), "acc" (the alteration of the displayed accidental or None) and "tie" (the tie type or None)
+        beams (list): the beam types, e.g. ["start", "partial"]
+        tuplets (list): one dictionary for each tuplet, with keys "type", "actual", "normal", "normal_show" and "bracket"
+        staff (int): the staff number, 0 if it is not assigned
+    """
+
+    def __init__(
+        self,
+        offset,
+        quarter_length,
+        type,
+        dots=0,
+        is_grace=False,
+        is_rest=False,
+        pitches=None,
+        beams=None,
+        tuplets=None,
+        staff=0,
+    ):
+        self.offset = offset
+        self.quarter_length = quarter_length
+        self.type = type
+        self.dots = dots
+        self.is_grace = is_grace
+        self.is_rest = is_rest
+        self.pitches = [] if pitches is None else pitches
+        self.beams = [] if beams is None else beams
+        self.tuplets = [] if tuplets is None else tuplets
+        self.staff = staff
+
+    def __repr__(self):
+        return "XMLGeneralNote({}, {}, {})".format(
+            self.offset, self.quarter_length, "R" if self.is_rest else self.midi()
+        )
+
+    def midi(self):
+        """Return the list of midi numbers of the pitches (constrained to 0-127 as in music21)."""
+        out = []
+        for p in self.pitches:
+            value = round(
+                (p["octave"] + 1) * 12 + STEP_PITCH_CLASSES[p["step"]] + p["alter"]
+            )
+            if value > 127:
+                value = (12 * 9) + (value % 12)
+                if value < (127 - 12):
+                    value += 12
+            elif value < 0:
+                value = 0 + (value % 12)
+            out.append(value)
+        return out
+
+
+## functions to read the general notes from the XML file
+
+
+def _text(element, tag, default=None):
+    """Return the stripped text of the first child with the given tag, or default."""
+    child = element.find(tag)
+    if child is None or child.text is None or child.text.strip() == "":
+        return default
+    return child.text.strip()
+
+
+def _type_from_xml(type_string):
+    """Convert a MusicXML type (e.g. "long", or "32th" from a Guitar Pro bug) to a music21 type."""
+    if type_string == "long":
+        return "longa"
+    elif type_string == "32th":
+        return "32nd"
+    return type_string
+
+
+def _type_and_dots_from_quarter_length(quarter_length):
+    """Get type and dots of a duration that is not specified by its type, as music21 does."""
+    d = m21.duration.Duration(quarter_length)
+    try:
+        return d.type, d.dots
+    except m21.duration.DurationException:
+        # e.g. gaps too small to be represented, the type is computed only when needed in music21
+        return None, 0
+
+
+def _xml_pitch(mx_note):
+    """Read the pitch of a <note> (without the ties)."""
+    mx_pitch = mx_note.find("pitch")
+    step = _text(mx_pitch, "step")
+    octave = int(_text(mx_pitch, "octave", 4))
+    alter = _text(mx_pitch, "alter")
+    alter = None if alter is None else float(alter)
+    acc_name = _text(mx_note, "accidental")
+    if acc_name is not None:
+        acc = alter if alter is not None else ACCIDENTAL_ALTERS.get(acc_name, 0)
+    elif alter is not None:
+        acc = alter
+    else:
+        acc = None
+    return {
+        "step": step,
+        "octave": octave,
+        "alter": 0 if acc is None else acc,
+        "acc": acc,
+    }
+
+
+def _xml_tie(mx_note):
+    """Read the tie type of a <note>, following music21 (start and stop together are a continue)."""
+    types = [t.get("type") for t in mx_note.findall("tie") if t.get("type") is not None]
+    if len(types) == 1:
+        return types[0]
+    elif "stop" in types and "start" in types:
+        return "continue"
+    return None
+
+
+def _xml_beams(mx_note):
+    """Read the beam types of a <note>, with the music21 names."""
+    beam_types = {
+        "begin": "start",
+        "continue": "continue",
+        "end": "stop",
+        "forward hook": "partial",
+        "backward hook": "partial",
+    }
+    out = []
+    for mx_beam in mx_note.findall("beam"):
+        text = "begin" if mx_beam.text is None else mx_beam.text.strip()
+        if text not in beam_types:
+            raise TypeError("Unexpected beam type: {}".format(text))
+        out.append(beam_types[text])
+    return out
+
+
+def _new_tuplet(actual=3, normal=2):
+    return {
+        "type": None,
+        "actual": actual,
+        "normal": normal,
+        "normal_show": False,
+        "bracket": True,
+    }
+
+
+def _xml_tuplets(mx_note, active_tuplets):
+    """Read the tuplets of a <note> with a <time-modification>.
+
+    It follows the music21 import: the tuplets started in previous notes (stored in active_tuplets,
+    that is updated) are continued, and a new tuplet is added if the time modification is not completely
+    explained by the tuplets.
+
+    Returns:
+        tuple: (tuplets, multiplier) where multiplier is the ratio between the real and the notated duration.
+    """
+    mx_time_modification = mx_note.find("time-modification")
+    time_mod_tuplet = _new_tuplet(
+        int(_text(mx_time_modification, "actual-notes", 3)),
+        int(_text(mx_time_modification, "normal-notes", 2)),
+    )
+    multiplier = Fraction(time_mod_tuplet["normal"], time_mod_tuplet["actual"])
+    remaining = multiplier
+    t = time_mod_tuplet
+    return_tuplets = [None] * 8
+    to_remove = set()
+    to_stop = set()
+
+    mx_notations = mx_note.find("notations")
+    if mx_notations is not None:
+        for mx_tuplet in mx_notations.findall("tuplet"):
+            # music21 sets the type on the previous tuplet (and it is kept only if copied)
+            t["type"] = mx_tuplet.get("type")
+            number = mx_tuplet.get("number")
+            index = int(number) if number is not None else 1
+            if t["type"] == "stop":
+                if active_tuplets[index] is not None:
+                    if any(active_tuplets[index] is rt for rt in return_tuplets):
+                        active_tuplets[index]["type"] = "startStop"
+                    to_remove.add(index)
+                    to_stop.add(index)
+                continue
+
+            mx_actual = mx_tuplet.find("tuplet-actual")
+            mx_normal = mx_tuplet.find("tuplet-normal")
+            if mx_actual is None or mx_normal is None:
+                t = copy.copy(time_mod_tuplet)
+            else:
+                t = _new_tuplet()
+                t["actual"] = int(_text(mx_actual, "tuplet-number", 3))
+                t["normal"] = int(_text(mx_normal, "tuplet-number", 2))
+
+            bracket = mx_tuplet.get("bracket")
+            if bracket is not None:
+                t["bracket"] = bracket == "yes"
+            show_number = mx_tuplet.get("show-number")
+            if show_number == "none":
+                if bracket is None:
+                    t["bracket"] = False
+            elif show_number == "both":
+                t["normal_show"] = True
+            if mx_tuplet.get("line-shape") == "curved":
+                t["bracket"] = "slur"
+            return_tuplets[index] = t
+            remaining /= Fraction(t["normal"], t["actual"])
+            active_tuplets[index] = t
+
+    # continue the tuplets started in the previous notes
+    for i in range(1, len(active_tuplets)):
+        active = active_tuplets[i]
+        if active is None or any(active is rt for rt in return_tuplets):
+            continue
+        active_copy = copy.copy(active)
+        active_copy["type"] = "stop" if i in to_stop else None
+        remaining /= Fraction(active_copy["normal"], active_copy["actual"])
+        return_tuplets[i] = active_copy
+
+    if remaining != 1:
+        return_tuplets[-1] = _new_tuplet(remaining.denominator, remaining.numerator)
+
+    for i in to_remove:
+        active_tuplets[i] = None
+
+    return [t for t in return_tuplets if t is not None], multiplier
+
+
+def _xml_duration(mx_note, divisions, active_tuplets):
+    """Read type, dots, tuplets and quarter length of a <note>.
+
+    As in music21, the quarter length is computed from the type, dots and time modification if the type is present,
+    otherwise from the <duration>.
+    """
+    is_grace = mx_note.find("grace") is not None
+    type_string = _text(mx_note, "type")
+    tuplets = []
+    if type_string is not None:
+        note_type = _type_from_xml(type_string)
+        dots = len(mx_note.findall("dot"))
+        quarter_length = Fraction(
+            m21.duration.typeToDuration[note_type]
+        ) * Fraction(2 ** (dots + 1) - 1, 2 ** dots)
+        if mx_note.find("time-modification") is not None:
+            tuplets, multiplier = _xml_tuplets(mx_note, active_tuplets)
+            quarter_length *= multiplier
+    else:
+        duration = _text(mx_note, "duration")
+        if duration is None:
+            quarter_length = Fraction(0)
+        else:
+            quarter_length = Fraction(duration) / divisions
+        if is_grace:
+            note_type, dots = "zero", 0
+        else:
+            note_type, dots = _type_and_dots_from_quarter_length(quarter_length)
+    if is_grace:
+        quarter_length = Fraction(0)
+    return note_type, dots, is_grace, quarter_length, tuplets
+
+
+def _xml_general_note(mx_notes, offset, divisions, active_tuplets):
+    """Create the XMLGeneralNote from a list of <note> (more than one for chords)."""
+    # type and duration of chords are the ones of the first note
+    note_type, dots, is_grace, quarter_length, tuplets = _xml_duration(
+        mx_notes[0], divisions, active_tuplets
+    )
+    for mx_note in mx_notes[1:]:
+        # other notes of the chords can also have time modifications
+        _xml_duration(mx_note, divisions, active_tuplets)
+    is_rest = len(mx_notes) == 1 and mx_notes[0].find("rest") is not None
+    pitches = []
+    if not is_rest:
+        for mx_note in mx_notes:
+            if mx_note.find("pitch") is None:
+                continue
+            p = _xml_pitch(mx_note)
+            p["tie"] = _xml_tie(mx_note)
+            pitches.append(p)
+    return XMLGeneralNote(
+        offset,
+        quarter_length,
+        note_type,
+        dots,
+        is_grace,
+        is_rest,
+        pitches,
+        _xml_beams(mx_notes[0]),
+        tuplets,
+        staff=int(_text(mx_notes[0], "staff", 0)),
+    )
+
+
+def _xml_bar_duration(mx_time):
+    """Return the duration in quarter notes of a bar with the time signature in <time>, or None (senza-misura)."""
+    if mx_time.find("senza-misura") is not None:
+        return None
+    beats = [sum(Fraction(b) for b in e.text.split("+")) for e in mx_time.iter("beats")]
+    beat_types = [int(e.text) for e in mx_time.iter("beat-type")]
+    return sum(Fraction(4 * b, t) for b, t in zip(beats, beat_types))
+
+
+def _sort_voice(gn_list):
+    """Sort by offset, grace notes before the other notes at the same offset (stable)."""
+    return sorted(gn_list, key=lambda gn: (gn.offset, not gn.is_grace))
+
+
+def _make_sequential(gn_list):
+    """Set the offsets of the general notes one after the other, as a voice created by m21utils.reconstruct()."""
+    gn_list = _sort_voice(gn_list)
+    offset = Fraction(0)
+    for gn in gn_list:
+        gn.offset = offset
+        offset += gn.quarter_length
+    return gn_list
+
+
+def _fill_gaps(gn_list, measure_end):
+    """Fill with hidden rests the gaps in a voice, as music21 does for measures with more than one voice."""
+    rests = []
+    lowest = min(gn.offset for gn in gn_list)
+    highest = max(gn.offset + gn.quarter_length for gn in gn_list)
+    if lowest > 0:
+        rests.append((0, lowest))
+    if measure_end > highest:
+        rests.append((highest, measure_end - highest))
+    end = None
+    for gn in _sort_voice(gn_list):
+        if end is not None and gn.offset > end:
+            rests.append((end, gn.offset - end))
+        end = (
+            gn.offset + gn.quarter_length
+            if end is None
+            else max(end, gn.offset + gn.quarter_length)
+        )
+    for offset, quarter_length in rests:
+        rest_type, dots = _type_and_dots_from_quarter_length(quarter_length)
+        gn_list.append(
+            XMLGeneralNote(offset, quarter_length, rest_type, dots, is_rest=True)
+        )
+    return _sort_voice(gn_list)
+
+
+def _read_measure(mx_measure, state):
+    """Read the voices of a <measure>.
+
+    Args:
+        mx_measure (Element): the <measure> XML element
+        state (dict): the state of the part, with keys "divisions", "bar_duration", "staves" and "active_tuplets",
+            updated by this function
+
+    Returns:
+        list: a list of voices for each staff (only one if the part has a single staff),
+            where each voice is a list of XMLGeneralNote.
+    """
+    voice_ids = set()
+    for mx_note in mx_measure.iter("note"):
+        voice = _text(mx_note, "voice")
+        if voice is not None:
+            voice_ids.add(voice)
+    use_voices = len(voice_ids) > 1
+
+    voices = {}
+    offset = Fraction(0)
+    measure_end = Fraction(0)
+    n_notes = 0
+    n_rests = 0
+    full_measure_rest = False
+    chord_notes = []
+    chord_voice = None
+    elements = list(mx_measure)
+    for i, element in enumerate(elements):
+        if element.tag == "attributes":
+            divisions = _text(element, "divisions")
+            if divisions is not None:
+                state["divisions"] = Fraction(divisions)
+            staves = _text(element, "staves")
+            if staves is not None:
+                state["staves"] = max(state["staves"], int(staves))
+            mx_time = element.find("time")
+            if mx_time is not None:
+                bar_duration = _xml_bar_duration(mx_time)
+                if bar_duration is not None:
+                    state["bar_duration"] = bar_duration
+        elif element.tag == "backup":
+            duration = _text(element, "duration")
+            if duration is not None:
+                offset -= Fraction(duration) / state["divisions"]
+        elif element.tag == "forward":
+            offset += Fraction(_text(element, "duration")) / state["divisions"]
+        elif element.tag == "note":
+            next_is_chord = (
+                i + 1 < len(elements)
+                and elements[i + 1].tag == "note"
+                and elements[i + 1].find("chord") is not None
+            )
+            if next_is_chord and _text(element, "voice") is not None:
+                chord_voice = _text(element, "voice")
+            chord_notes.append(element)
+            if next_is_chord:
+                continue
+            gn = _xml_general_note(
+                chord_notes, offset, state["divisions"], state["active_tuplets"]
+            )
+            if len(chord_notes) == 1 and element.find("chord") is None:
+                if gn.is_rest:
+                    n_rests += 1
+                    if element.find("rest").get("measure") == "yes":
+                        full_measure_rest = True
+                else:
+                    n_notes += 1
+            if use_voices:
+                voice = next(
+                    (
+                        _text(n, "voice")
+                        for n in chord_notes
+                        if _text(n, "voice") is not None
+                    ),
+                    chord_voice if chord_voice is not None else "1",
+                )
+            else:
+                voice = None
+            voices.setdefault(voice, []).append(gn)
+            chord_notes = []
+            offset += gn.quarter_length
+            measure_end = max(measure_end, offset)
+
+    if use_voices:
+        voices = [
+            _fill_gaps(voices[voice_id], measure_end)
+            for voice_id in sorted(voice_ids)
+            if voice_id in voices
+        ]
+    else:
+        voices = [_sort_voice(voices[None])] if None in voices else []
+
+    if full_measure_rest or (n_rests == 1 and n_notes == 0):
+        # music21 sets the duration of a whole (or breve) rest to the duration of the bar
+        rest = next((gn for v in voices for gn in v if gn.is_rest), None)
+        if (
+            rest is not None
+            and rest.quarter_length != state["bar_duration"]
+            and rest.type in ("whole", "breve")
+            and rest.dots == 0
+            and len(rest.tuplets) == 0
+        ):
+            rest.quarter_length = state["bar_duration"]
+            rest.type, rest.dots = _type_and_dots_from_quarter_length(
+                rest.quarter_length
+            )
+
+    if state["staves"] == 1:
+        if not use_voices:
+            # the general notes are appended one after the other in a new voice
+            return [[_make_sequential(v) for v in voices]]
+        return [voices]
+
+    # music21 separates the staves in different parts, and the hidden rests go in all the staves
+    out = []
+    for staff in range(1, state["staves"] + 1):
+        staff_voices = [
+            [gn for gn in v if gn.staff == staff or gn.staff == 0] for v in voices
+        ]
+        staff_voices = [v for v in staff_voices if len(v) > 0]
+        if not use_voices or len(staff_voices) == 1:
+            staff_voices = [_make_sequential(v) for v in staff_voices]
+        out.append(staff_voices)
+    return out
+
+
+def iter_musicxml(musicxml_path: str):
+    """Read a (partwise) MusicXML file measure by measure, with an incremental parser.
+
+    The XML elements of each measure are discarded after it is read, so the memory used does not
+    grow with the length of the score.
+    As in music21, a part with more than one staff is split into one part for each staff.
+
+    Args:
+        musicxml_path (str): the path of the MusicXML file
+
+    Raises:
+        TypeError: if the file is not a partwise MusicXML
+
+    Yields:
+        tuple: (part_index, measure_index, voices), where voices is a list of lists of XMLGeneralNote.
+    """
+    n_parts = 0  # the number of parts before the current one
+    measure_index = -1
+    state = None
+    root = None
+    for event, element in ET.iterparse(str(musicxml_path), events=("start", "end")):
+        if event == "start":
+            if root is None:
+                root = element
+                if root.tag != "score-partwise":
+                    raise TypeError("Only partwise MusicXML files are supported")
+            continue
+        if element.tag == "measure":
+            if state is None:  # first measure of a new part
+                measure_index = -1
+                state = {
+                    "divisions": Fraction(1),
+                    "bar_duration": Fraction(4),
+                    "staves": 1,
+                    "active_tuplets": [None] * 7,
+                }
+            measure_index += 1
+            staves = _read_measure(element, state)
+            element.clear()
+            for staff_index, voices in enumerate(staves):
+                yield n_parts + staff_index, measure_index, voices
+        elif element.tag == "part":
+            if state is not None:
+                n_parts += state["staves"]
+            state = None
+            root.remove(element)
+
+
+def read_musicxml(musicxml_path: str) -> list:
+    """Read a (partwise) MusicXML file.
+
+    Args:
+        musicxml_path (str): the path of the MusicXML file
+
+    Returns:
+        list: a nested list [part][measure][voice] of lists of XMLGeneralNote.
+    """
+    parts = []
+    for part_index, measure_index, voices in iter_musicxml(musicxml_path):
+        if part_index == len(parts):
+            parts.append([])
+        parts[part_index].append(voices)
+    return parts
+
+
+## functions to extract descriptors from the XMLGeneralNotes, equivalent to the ones in m21utils
+
+
+def xml_gn2pitches_list(gn: XMLGeneralNote):
+    """Get the list of pitches in a general note, as m21utils.gn2pitches_list()."""
+    if gn.is_rest:
+        return "R"
+    sorted_pitches = sorted(
+        gn.pitches,
+        key=lambda p: (p["octave"] + 1) * 12 + STEP_PITCH_CLASSES[p["step"]] + p["alter"],
+    )
+    return [
+        {
+            "npp": p["step"] + str(p["octave"]),
+            "acc": None if p["acc"] is None else int(p["acc"]),
+            "tie": p["tie"] == "stop" or p["tie"] == "continue",
+        }
+        for p in sorted_pitches
+    ]
+
+
+def xml_get_type_number(gn: XMLGeneralNote):
+    """Get the type number for a general note, as m21utils.get_type_number()."""
+    if gn.is_grace and gn.type == "zero":
+        return 8
+    return int(m21.duration.convertTypeToNumber(gn.type))
+
+
+def xml_gn2label(gn: XMLGeneralNote):
+    """Get the label of a general note, as m21utils.gn2label()."""
+    type_number = xml_get_type_number(gn)
+    note_head = 4 if type_number >= 4 else type_number
+    return (xml_gn2pitches_list(gn), note_head, gn.dots, gn.is_grace)
+
+
+def xml_get_beams(gn: XMLGeneralNote):
+    """Return the (part of) beamings on top of a general note, as m21utils.get_beams()."""
+    beam_list = [] if gn.is_rest else list(gn.beams)
+    if len(beam_list) == 0:  # add informations for rests and notes not grouped
+        type_number = xml_get_type_number(gn)
+        for __ in range(int(math.log(type_number / 4, 2))):
+            beam_list.append("partial")
+    return beam_list
+
+
+def xml_get_tuplets(gn: XMLGeneralNote):
+    """Return the (part of) tuplets on top of a general note, as m21utils.get_tuplets()."""
+    return ["continue" if t["type"] is None else t["type"] for t in gn.tuplets]
+
+
+def xml_get_tuplets_info(gn: XMLGeneralNote):
+    """Create a list with the string that is on the tuplet bracket, as m21utils.get_tuplets_info()."""
+    tuple_info = []
+    for t in gn.tuplets:
+        if t["normal_show"]:  # if there is a notation like "2:3"
+            new_info = str(t["actual"]) + ":" + str(t["normal"])
+        else:  # just a number for the tuplets
+            new_info = str(t["actual"])
+        # if the brackets are drown explicitly, add B
+        if t["bracket"]:
+            new_info = new_info + "B"
+        tuple_info.append(new_info)
+    return tuple_info
+
+
+def xml_2_seq_struct(gn_list: Iterable[XMLGeneralNote], struct_type: str):
+    """Generate the sequential structure of a voice in a measure, as m21utils.m21_2_seq_struct().
+
+    Args:
+        gn_list (Iterable[XMLGeneralNote]): the general notes in a measure (and a single voice)
+        struct_type (string): either "beamings" or "tuplets"
+
+    Raises:
+        TypeError: if struct_type is not "beamings" nor "tuplets"
+
+    Returns:
+        couple: (seq_structure, grouping_info)
+    """
+    if struct_type == "beamings":
+        seq_structure = [xml_get_beams(gn) for gn in gn_list]
+        seq_structure = _correct_beamings(
+            seq_structure, [gn.is_rest for gn in gn_list]
+        )
+        grouping_info = [["" for ee in e] for e in seq_structure]
+    elif struct_type == "tuplets":
+        seq_structure = correct_tuplet([xml_get_tuplets(gn) for gn in gn_list])
+        grouping_info = [xml_get_tuplets_info(gn) for gn in gn_list]
+    else:
+        raise TypeError("Only beamings and tuplets are allowed types")
+    return seq_structure, grouping_info
+
+
+def xml_2_notationtree(
+    gn_list: Iterable[XMLGeneralNote],
+    tree_type: str,
+    consider_grace_notes: bool = False,
+) -> NotationTree:
+    """Generate a notation tree from the general notes of a voice in a measure, as m21utils.m21_2_notationtree().
+
+    Args:
+        gn_list (Iterable[XMLGeneralNote]): the general notes in a measure (and a single voice)
+        tree_type (str): either "beamings" or "tuplets"
+        consider_grace_notes (bool) : consider or not grace notes in the structure. WARNING only simple grace notes groups are supported
+
+    Returns:
+        NotationTree: the notation tree (BT or TT)
+    """
+    if not consider_grace_notes:  # delete grace notes from the input list
+        gn_list = [e for e in gn_list if not e.is_grace]
+    seq_structure, grouping_info = xml_2_seq_struct(gn_list, tree_type)
+    leaf_label_list = [xml_gn2label(gn) for gn in gn_list]
+    return seq_struct2notationtree(
+        seq_structure, grouping_info, leaf_label_list, tree_type
+    )
+
+
+def xml_2_timeline(gn_list: Iterable[XMLGeneralNote], backend="object") -> Timeline:
+    """Create the timeline of a voice in a measure, as m21utils.m21_2_timeline()."""
+    gn_list = list(gn_list)
+    events = [
+        Event(gn.offset, REST_SYMBOL) if gn.is_rest else Event(gn.offset, gn.midi())
+        for gn in gn_list
+    ]
+    return Timeline(
+        events,
+        start=0,
+        end=sum([gn.quarter_length for gn in gn_list]),
+        backend=backend,
+    )
+
+
+def xml_2_rhythmtree(
+    gn_list, allowed_divisions=[2, 3], max_depth=7, div_preferences=None
+):
+    """Create the rhythm tree of a voice in a measure, as m21utils.m21_2_rhythmtree()."""
+    tim = xml_2_timeline(gn_list)
+    return timeline2rt(tim, allowed_divisions, max_depth, div_preferences)
+
+
+def xml_2_voice_descriptors(
+    gn_list: Iterable[XMLGeneralNote], consider_grace_notes: bool = False
+) -> dict:
+    """Extract the compact information needed to build the trees of a voice in a measure.
+
+    The output is the same of m21utils.m21_2_voice_descriptors(), so it can be given to m21utils.voice_descriptors2trees().
+
+    Args:
+        gn_list (Iterable[XMLGeneralNote]): the general notes in a measure (and a single voice)
+        consider_grace_notes (bool, optional): consider or not grace notes in the notation trees. Defaults to False.
+
+    Returns:
+        dict: with keys "timeline", "labels", "beamings" and "tuplets".
+    """
+    gn_list = list(gn_list)
+    timeline = xml_2_timeline(gn_list, backend="columnar")
+    if not consider_grace_notes:
+        gn_list = [e for e in gn_list if not e.is_grace]
+    return {
+        "timeline": timeline,
+        "labels": [xml_gn2label(gn) for gn in gn_list],
+        "beamings": xml_2_seq_struct(gn_list, "beamings"),
+        "tuplets": xml_2_seq_struct(gn_list, "tuplets"),
+    }
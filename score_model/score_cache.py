@@ -0,0 +1,151 @@
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+
+import music21 as m21
+
+import score_model.m21utils as m21u
+
+# change it when the format of the cached scores changes
+CACHE_VERSION = "1"
+
+
+class ScoreCache:
+    """A persistent cache of parsed (and reconstructed) music21 scores, stored in a directory.
+
+    The scores are indexed by the hash of the content of the file, so a modified file is parsed again.
+    When the total size of the cache exceeds max_size, the least recently used scores are deleted.
+    """
+
+    def __init__(self, cache_dir: str, max_size: int = 2 ** 30):
+        """Initialize the cache, creating the directory if it does not exist.
+
+        Args:
+            cache_dir (str): the directory where the scores are stored
+            max_size (int, optional): the maximum size of the cache in bytes. Defaults to 1GB.
+        """
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_size = max_size
+
+    def key(self, musicxml_path: str, auto_format: bool) -> str:
+        """Return the key of a score, computed from the file content and the import options."""
+        h = hashlib.sha256()
+        h.update(Path(musicxml_path).read_bytes())
+        h.update(
+            "{}|{}|{}".format(CACHE_VERSION, m21.VERSION_STR, auto_format).encode()
+        )
+        return h.hexdigest()
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / (key + ".p")
+
+    def get(self, musicxml_path: str, auto_format: bool = True):
+        """Return the cached score for a file, or None if it is not in the cache.
+
+        Args:
+            musicxml_path (str): the path of the music_xml
+            auto_format (bool, optional): if the score has been reconstructed. Defaults to True.
+
+        Returns:
+            m21.stream.Score: the score, or None.
+        """
+        entry = self._entry_path(self.key(musicxml_path, auto_format))
+        try:
+            data = entry.read_bytes()
+        except FileNotFoundError:
+            return None
+        try:
+            thawer = m21.freezeThaw.StreamThawer()
+            thawer.openStr(data)
+        except Exception:  # corrupted entry, e.g. from another version of the libraries
+            try:
+                entry.unlink()
+            except FileNotFoundError:  # deleted by another process
+                pass
+            return None
+        try:
+            os.utime(entry)  # mark the entry as recently used
+        except FileNotFoundError:  # deleted by another process, the score is already read
+            pass
+        return thawer.stream
+
+    def put(self, musicxml_path: str, score, auto_format: bool = True):
+        """Store a score in the cache, and delete the least recently used scores if the cache is too big.
+
+        Args:
+            musicxml_path (str): the path of the music_xml
+            score (m21.stream.Score): the parsed score
+            auto_format (bool, optional): if the score has been reconstructed. Defaults to True.
+        """
+        entry = self._entry_path(self.key(musicxml_path, auto_format))
+        data = m21.freezeThaw.StreamFreezer(score).writeStr(fmt="pickle")
+        # write in a temporary file first, so that other processes never read a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=str(self.cache_dir), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, str(entry))
+        self.evict()
+
+    def size(self) -> int:
+        """Return the total size in bytes of the cached scores."""
+        total_size = 0
+        for entry in self.cache_dir.glob("*.p"):
+            try:
+                total_size += entry.stat().st_size
+            except FileNotFoundError:  # deleted by another process
+                continue
+        return total_size
+
+    def evict(self):
+        """Delete the least recently used scores until the size of the cache is at most max_size."""
+        entries = []
+        for entry in self.cache_dir.glob("*.p"):
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:  # deleted by another process
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry))
+        entries.sort(key=lambda e: e[0])
+        total_size = sum([e[1] for e in entries])
+        for _, entry_size, entry in entries:
+            if total_size <= self.max_size:
+                break
+            try:
+                entry.unlink()
+            except FileNotFoundError:
+                pass
+            total_size -= entry_size
+
+    def clear(self):
+        """Delete all the cached scores."""
+        for entry in self.cache_dir.glob("*.p"):
+            try:
+                entry.unlink()
+            except FileNotFoundError:  # deleted by another process
+                continue
+
+
+def parse_score(musicxml_path: str, auto_format: bool = True, cache: ScoreCache = None):
+    """Parse a score with music21, and reconstruct it with the hierarchy score, parts, measures, voices.
+
+    Args:
+        musicxml_path (str): the path of the music_xml to import
+        auto_format (bool, optional): reconstruct the score. Defaults to True.
+        cache (ScoreCache, optional): if given, the score is taken from the cache instead of parsing it, 
+            and parsed scores are added to the cache. Defaults to None.
+
+    Returns:
+        m21.stream.Score: the score
+    """
+    if cache is not None:
+        score = cache.get(musicxml_path, auto_format)
+        if score is not None:
+            return score
+    score = m21.converter.parse(str(Path(musicxml_path)))
+    if auto_format:
+        m21u.reconstruct(score)
+    if cache is not None:
+        cache.put(musicxml_path, score, auto_format)
+    return score
@@ -1,10 +1,13 @@
 import copy
-from score_model.music_sequences import Timeline
+from score_model.music_sequences import Timeline, TimelineBuilder
 import music21 as m21
 
-from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 
 import score_model.m21utils as m21u
+from score_model.score_cache import ScoreCache, parse_score
+from score_model.musicxml_reader import iter_musicxml, xml_2_voice_descriptors
 
 
 class ScoreModel:
@@ -12,19 +15,80 @@ class ScoreModel:
     """
 
     def __init__(
-        self, musicxml_path: str, auto_format: bool = True, produce_trees: bool = False
+        self,
+        musicxml_path: str,
+        auto_format: bool = True,
+        produce_trees: bool = False,
+        n_workers: int = 1,
+        cache: ScoreCache = None,
     ):
         """Initialize the ScoreModel from a music21 score object.
 
         Args:
             musicxml_path: the path of the music_xml to import
             auto_format (bool, optional): Auto format the score with the hierarchy score, parts, measures, voices. Defaults to True.
-            produce_trees (bool, optional): Produce the BT and TT for each measure. Defaults to False.
+            produce_trees (bool, optional): Produce the BT, TT and RT for each voice in each measure. Defaults to False.
+            n_workers (int, optional): the number of processes used to produce the trees. None uses all the cores. Defaults to 1.
+            cache (ScoreCache, optional): a persistent cache, to avoid parsing again the same score. Defaults to None.
         """
-        self.m21_score = m21.converter.parse(str(Path(musicxml_path)))
+        self.m21_score = parse_score(musicxml_path, auto_format, cache)
         self.produce_trees = produce_trees
-        if auto_format:
-            m21u.reconstruct(self.m21_score)
+        self.trees = None
+        if produce_trees:
+            self.trees = self.get_trees(n_workers=n_workers)
+
+    def get_trees(
+        self,
+        n_workers: int = 1,
+        allowed_divisions=[2, 3],
+        max_depth=7,
+        div_preferences=None,
+    ):
+        """Build the beaming tree, the tuplet tree and the rhythm tree for each voice in each measure of each part.
+
+        The music21 objects are converted to compact descriptors in this process, 
+        then the trees are built in a pool of processes.
+
+        Args:
+            n_workers (int, optional): the number of processes. 1 builds the trees in this process, None uses all the cores. Defaults to 1.
+            allowed_divisions (list, optional): division to consider for the RTs. Defaults to [2, 3].
+            max_depth (int, optional): maximum depth to consider for the RTs. Defaults to 7.
+            div_preferences (list, optional): preferred div values for the RTs. Defaults to None.
+
+        Returns:
+            list: a nested list [part][measure][voice] of triples (BT, TT, RT).
+        """
+        descriptors = []
+        shape = []  # the number of voices in each measure of each part
+        for p in self.m21_score.parts:
+            shape.append([])
+            for m in p.getElementsByClass(m21.stream.Measure):
+                voices = m.getElementsByClass(m21.stream.Voice)
+                shape[-1].append(len(voices))
+                for voice in voices:
+                    gn_list = voice.getElementsByClass(m21.note.GeneralNote)
+                    descriptors.append(m21u.m21_2_voice_descriptors(gn_list))
+
+        build = partial(
+            m21u.voice_descriptors2trees,
+            allowed_divisions=allowed_divisions,
+            max_depth=max_depth,
+            div_preferences=div_preferences,
+        )
+        if n_workers == 1:
+            trees = [build(d) for d in descriptors]
+        else:
+            with ProcessPoolExecutor(max_workers=n_workers) as executor:
+                trees = list(executor.map(build, descriptors, chunksize=16))
+
+        # go back to the structure of the score
+        out = []
+        it = iter(trees)
+        for part_shape in shape:
+            out.append(
+                [[next(it) for _ in range(n_voices)] for n_voices in part_shape]
+            )
+        return out
 
     def get_voices(self):
         voices = []
@@ -38,13 +102,12 @@ class ScoreModel:
 
         return [m21u.m21_2_timeline(v) for v in voices]
 
-    def get_timelines(self):
-        # return one timeline for each voice.
+    def _iter_timelines(self):
+        # yield one timeline for each voice, one part at a time.
         # TODO: Consider all voices, for now works with only the first of each part
         # TODO: merge if there are continuations at the beginning of the measures
-        timelines = []
         for ip, p in enumerate(self.m21_score.parts):
-            voice_tim = None  # empty timeline for the voice
+            voice_tim = TimelineBuilder()  # empty timeline for the voice
             for im, m in enumerate(p.getElementsByClass(m21.stream.Measure)):
                 # consider only the first voice (TO UPDATE)
                 voice = m.getElementsByClass(m21.stream.Voice)[0]
@@ -52,9 +115,12 @@ class ScoreModel:
                 m_tim = m21u.m21_2_timeline(gn_list).shift_and_rescale(
                     0, 1
                 )  # force each measure to be in the interval 0-1
-                voice_tim = m_tim if voice_tim is None else voice_tim + m_tim
-            timelines.append(voice_tim)
-        return timelines
+                voice_tim.append(m_tim)
+            yield voice_tim.build() if len(voice_tim) > 0 else None
+
+    def get_timelines(self):
+        # return one timeline for each voice.
+        return list(self._iter_timelines())
 
     def get_timelines_json(self):
         out_json = {"name": "piece_name", "grammar": "grammar_name", "voices": []}
@@ -62,3 +128,92 @@ class ScoreModel:
             out_json["voices"].append(tim.to_json("duration"))
         return out_json
 
+    def write_timelines_json(self, fp):
+        """Write the JSON encoding of get_timelines_json() in a binary file object.
+
+        The voices are computed and written one at a time, so only one timeline is in memory.
+
+        Args:
+            fp (file): a binary file object, e.g. io.BytesIO or a file opened with "wb"
+        """
+        fp.write(b'{"name": "piece_name", "grammar": "grammar_name", "voices": [')
+        for i, tim in enumerate(self._iter_timelines()):
+            if i > 0:
+                fp.write(b", ")
+            tim.write_json(fp, "duration")
+        fp.write(b"]}")
+
+
+def stream_score(
+    musicxml_path: str,
+    produce_trees: bool = False,
+    allowed_divisions=[2, 3],
+    max_depth=7,
+    div_preferences=None,
+):
+    """Process a score measure by measure, without building the whole score in memory.
+
+    The MusicXML file is read with musicxml_reader.iter_musicxml(), so the memory used does not grow
+    with the length of the score. Parts with more than one staff are split into one part for each staff,
+    as in ScoreModel, and the measures of different parts can be interleaved.
+
+    Args:
+        musicxml_path (str): the path of the music_xml to import
+        produce_trees (bool, optional): Produce the BT, TT and RT for each voice. Defaults to False.
+        allowed_divisions (list, optional): division to consider for the RTs. Defaults to [2, 3].
+        max_depth (int, optional): maximum depth to consider for the RTs. Defaults to 7.
+        div_preferences (list, optional): preferred div values for the RTs. Defaults to None.
+
+    Yields:
+        tuple: (part_index, measure_index, voice_index, timeline, trees), where trees is the triple (BT, TT, RT)
+            if produce_trees is True, otherwise None.
+    """
+    for part_index, measure_index, voices in iter_musicxml(musicxml_path):
+        for voice_index, gn_list in enumerate(voices):
+            descriptors = xml_2_voice_descriptors(gn_list)
+            trees = None
+            if produce_trees:
+                trees = m21u.voice_descriptors2trees(
+                    descriptors, allowed_divisions, max_depth, div_preferences
+                )
+            yield part_index, measure_index, voice_index, descriptors["timeline"], trees
+
+
+def fold_timelines(stream) -> list:
+    """Build the timelines of a whole score from the output of stream_score(), as ScoreModel.get_timelines().
+
+    Only the first voice of each measure is considered, and each measure is rescaled in the interval 0-1.
+
+    Args:
+        stream (Iterable): the tuples yielded by stream_score()
+
+    Returns:
+        list: one timeline for each part.
+    """
+    builders = []
+    for part_index, measure_index, voice_index, timeline, trees in stream:
+        if voice_index != 0:
+            continue
+        while len(builders) <= part_index:
+            builders.append(TimelineBuilder())
+        builders[part_index].append(timeline.shift_and_rescale(0, 1))
+    return [b.build() if len(b) > 0 else None for b in builders]
+
+
+def fold_trees(stream) -> list:
+    """Collect the trees of a whole score from the output of stream_score(produce_trees=True), as ScoreModel.get_trees().
+
+    Args:
+        stream (Iterable): the tuples yielded by stream_score()
+
+    Returns:
+        list: a nested list [part][measure][voice] of triples (BT, TT, RT).
+    """
+    out = []
+    for part_index, measure_index, voice_index, timeline, trees in stream:
+        while len(out) <= part_index:
+            out.append([])
+        while len(out[part_index]) <= measure_index:
+            out[part_index].append([])
+        out[part_index][measure_index].append(trees)
+    return out
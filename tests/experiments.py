@@ -123,3 +123,64 @@ env["musescoreDirectPNGPath"] = "path/to/your/museScore"
 from score_model.server_communication import send_to_qparse
 from score_model.music_sequences import Timeline, MusicalContent
 
+# %%
+# memory and construction time of Event and Node (with __slots__),
+# compared with the same classes with a __dict__, on the timelines and the rhythm trees of a test score
+import timeit
+import tracemalloc
+from score_model.music_sequences import Event
+from score_model.bar_trees import Root, InternalNode, LeafNode
+
+
+class DictEvent(Event):
+    pass
+
+
+class DictInternalNode(InternalNode):
+    pass
+
+
+class DictLeafNode(LeafNode):
+    pass
+
+
+score = score_model.ScoreModel("tests/test_musicxml/test_score2.musicxml")
+timelines = score.get_timelines()
+events = [(e.timestamp, e.musical_artifact) for t in timelines for e in t.events] * 1000
+rts = [rt for part in score.get_trees() for measure in part for _, _, rt in measure]
+
+
+def make_events(event_class):
+    return [event_class(t, a) for t, a in events]
+
+
+def make_nodes(internal_class, leaf_class):
+    nodes = []
+    for _ in range(1000):
+        for rt in rts:
+            root = Root()
+            for node in rt.get_nodes()[1:]:  # the nodes of the tree, under a new root
+                if node.type == "leaf":
+                    nodes.append(leaf_class(root, node.label))
+                else:
+                    nodes.append(internal_class(root, node.label))
+    return nodes
+
+
+for name, make in [
+    ("Event", lambda: make_events(Event)),
+    ("Event with __dict__", lambda: make_events(DictEvent)),
+    ("Node", lambda: make_nodes(InternalNode, LeafNode)),
+    ("Node with __dict__", lambda: make_nodes(DictInternalNode, DictLeafNode)),
+]:
+    tracemalloc.start()
+    objects = make()
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    seconds = min(timeit.repeat(make, number=1, repeat=3))
+    print(
+        "{:<20} {:>8} objects {:>6.1f} bytes/object {:>8.3f} us/object".format(
+            name, len(objects), memory / len(objects), seconds * 1e6 / len(objects)
+        )
+    )
+    del objects
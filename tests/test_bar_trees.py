@@ -1,5 +1,8 @@
 import music21 as m21
 import numpy as np
+import pickle
+import pytest
+import weakref
 from pathlib import Path
 from fractions import Fraction
 
@@ -11,6 +14,7 @@ from score_model.bar_trees import (
     NotationTree,
     RhythmTree,
     simplify_label,
+    FlatTree,
 )
 from score_model.m21utils import gn2label
 from score_model.music_sequences import Event, Timeline
@@ -121,6 +125,29 @@ def test_timeline2rt():
     assert len(rt5.get_leaf_nodes()[0].parent.children) == 3
 
 
+def test_leaves_ticks():
+    tim = Timeline(
+        [Event(0, [60]), Event(Fraction(1, 2), [62]), Event(Fraction(3, 4), [64])],
+        start=0,
+        end=1,
+    )
+    rt = timeline2rt(tim)
+    onsets, durations, resolution = rt.get_leaves_ticks()
+    assert resolution == 4
+    assert list(onsets) == [0, 2, 3]
+    assert list(durations) == [2, 1, 1]
+    assert rt.get_leaves_ticks()[0] is onsets  # the ticks are computed only once
+    for leaf, duration in zip(rt.get_leaf_nodes(), durations):
+        assert rt.node_duration(leaf) == Fraction(int(duration), resolution)
+    assert rt.get_timeline() == tim
+    # the ticks are computed again when the tree is modified
+    LeafNode(rt.root.children[0].children[1], [[65]])
+    onsets, durations, resolution = rt.get_leaves_ticks()
+    assert resolution == 6
+    assert list(onsets) == [0, 3, 4, 5]
+    assert list(durations) == [3, 1, 1, 1]
+
+
 def test_simplify_label1():
     n1 = m21.note.Note("E--5")
     n1.duration.quarterLength = 3
@@ -132,3 +159,229 @@ def test_simplify_label2():
     n_grace = n1.getGrace()
     n2 = m21.note.Note("E#5")
     assert simplify_label(gn2label(n_grace)) == "[D4]4gn"
+
+
+def test_timeline2rt_memoize():
+    # the memoized search gives the same trees as the exhaustive search
+    timelines = [
+        Timeline([Event(0, [88]), Event(1, [90])], start=0, end=3),
+        Timeline([Event(0, [87]), Event(0, [88]), Event(1, [90, 94])], start=0, end=3),
+        Timeline([Event(Fraction(i, 4), [60]) for i in [0, 1, 3]], start=0, end=1),
+        Timeline([Event(Fraction(i, 6), [60]) for i in [0, 1, 2, 4]], start=0, end=1),
+        Timeline([Event(Fraction(i, 3), [40]) for i in range(6)], start=0, end=2),
+    ]
+    for tim in timelines:
+        assert str(timeline2rt(tim, memoize=True)) == str(
+            timeline2rt(tim, memoize=False)
+        )
+        rt1 = timeline2rt(tim, max_depth=3, div_preferences=[3, 2, 2], memoize=True)
+        rt2 = timeline2rt(tim, max_depth=3, div_preferences=[3, 2, 2], memoize=False)
+        assert str(rt1) == str(rt2)
+
+
+def test_timeline2rt_prune():
+    # the branch-and-bound search gives the same trees as the memoized search
+    timelines = [
+        Timeline([Event(Fraction(i, 8), [60]) for i in [0, 1, 3, 6]], start=0, end=1),
+        Timeline([Event(Fraction(i, 12), [60]) for i in [0, 3, 4, 8]], start=0, end=1),
+        Timeline([Event(Fraction(i, 3), [40]) for i in range(6)], start=0, end=2),
+    ]
+    for tim in timelines:
+        assert str(timeline2rt(tim, prune=True)) == str(timeline2rt(tim, prune=False))
+        rt1 = timeline2rt(tim, max_depth=3, div_preferences=[3, 2, 2], prune=True)
+        rt2 = timeline2rt(tim, max_depth=3, div_preferences=[3, 2, 2], prune=False)
+        assert str(rt1) == str(rt2)
+    # dense timelines, where most of the subtrees are pruned
+    for n in [12, 16]:
+        tim = Timeline([Event(Fraction(i, n), [60]) for i in range(n)], start=0, end=1)
+        assert str(timeline2rt(tim, prune=True)) == str(timeline2rt(tim, prune=False))
+
+
+def test_flattree1():
+    n1 = m21.note.Note("E--5")
+    n2 = m21.note.Note("D4")
+    root = Root()
+    node1 = InternalNode(root, "")
+    node2 = InternalNode(node1, "")
+    node3 = LeafNode(node2, gn2label(n1))
+    node4 = LeafNode(node2, gn2label(n2))
+    node5 = LeafNode(node1, gn2label(n2))
+    node6 = LeafNode(root, gn2label(n1))
+    nt = NotationTree(root, tree_type="beamings")
+    ft = FlatTree.from_tree(nt)
+    assert len(ft) == 7
+    assert list(ft.parent) == [-1, 0, 1, 2, 2, 1, 0]
+    assert list(ft.first_child) == [1, 2, 3, -1, -1, -1, -1]
+    assert list(ft.next_sibling) == [-1, 6, 5, 4, -1, -1, -1]
+    assert len(ft.labels) == 4  # None, "" and two different leaf labels
+    assert ft.get_label(5) == gn2label(n2)
+    assert ft.get_children(1) == [2, 5]
+    assert ft.get_nodes() == list(range(7))
+    assert ft.get_nodes(local_root=1) == [1, 2, 3, 4, 5]
+    assert ft.get_leaf_nodes() == [3, 4, 5, 6]
+    assert ft.get_leaf_nodes(local_root=2) == [3, 4]
+    assert [ft.get_depth(n) for n in range(7)] == [0, 1, 2, 3, 3, 2, 1]
+    assert ft.get_ancestors(4) == [2, 1, 0]
+    assert ft.get_ancestors(0) == []
+    assert ft.get_lca(3, 4) == 2
+    assert ft.get_lca(4, 5) == 1
+    assert ft.get_lca(5, 6) == 0
+    assert ft.get_lca(0, 4) == 0
+    # convert back to a Node structure
+    nt2 = ft.to_tree()
+    assert isinstance(nt2, NotationTree)
+    assert nt2.tree_type == "beamings"
+    assert nt2 == nt
+
+
+def test_flattree2():
+    tim = Timeline([Event(Fraction(i, 6), [60]) for i in [0, 1, 2, 4]], start=0, end=1)
+    rt = timeline2rt(tim)
+    ft = FlatTree.from_tree(rt)
+    assert [ft.get_label(n) for n in ft.get_leaf_nodes()] == [
+        n.label for n in rt.get_leaf_nodes()
+    ]
+    rt2 = ft.to_tree()
+    assert isinstance(rt2, RhythmTree)
+    assert rt2 == rt
+
+
+def test_lca_index():
+    n1 = m21.note.Note("E--5")
+    root = Root()
+    node1 = InternalNode(root, "")
+    node2 = InternalNode(node1, "")
+    node3 = LeafNode(node2, gn2label(n1))
+    node4 = LeafNode(node2, gn2label(n1))
+    node5 = LeafNode(node1, gn2label(n1))
+    node6 = LeafNode(root, gn2label(n1))
+    nt = NotationTree(root, tree_type="beamings")
+    index = nt.get_lca_index()
+    assert index is nt.get_lca_index()  # the index is built only once
+    nodes = nt.get_nodes()
+    assert [index.depth(n) for n in nodes] == [nt.get_depth(n) for n in nodes]
+    for n1 in nodes:
+        for n2 in nodes:
+            if n1 is not n2:
+                assert index.lca(n1, n2) is nt.get_lca(n1, n2)
+    assert index.lca(node4, node4) is node4
+    with pytest.raises(Exception):
+        index.lca(node3, LeafNode(None, gn2label(n1)))
+    # the index is built again when the tree is modified
+    label = node3.label
+    node7 = LeafNode(node2, label)
+    index = nt.get_lca_index()
+    assert index.depth(node7) == 3
+    assert index.lca(node7, node5) is node1
+    node8 = LeafNode(None, label)
+    node8.parent = node1
+    node1.add_child(node8)
+    assert nt.get_lca_index().lca(node8, node3) is node1
+
+
+def test_leaves_counts():
+    n1 = m21.note.Note("E--5")
+    root = Root()
+    node1 = InternalNode(root, "")
+    node2 = InternalNode(node1, "")
+    LeafNode(node2, gn2label(n1))
+    LeafNode(node2, gn2label(n1))
+    LeafNode(node1, gn2label(n1))
+    LeafNode(root, gn2label(n1))
+    nt = NotationTree(root, tree_type="beamings")
+    counts = nt.get_leaves_counts()
+    assert counts is nt.get_leaves_counts()  # the counts are computed only once
+    for n in nt.get_nodes():
+        assert counts[id(n)] == len(nt.get_leaf_nodes(local_root=n))
+    # the counts are computed again when the tree is modified
+    assert counts[id(root)] == 4
+    LeafNode(root, gn2label(n1))
+    assert nt.get_leaves_counts()[id(root)] == 5
+
+
+def test_node_slots():
+    root = Root()
+    node = InternalNode(root, "")
+    leaf = LeafNode(node, [60])
+    assert not hasattr(leaf, "__dict__")
+    assert weakref.ref(leaf)() is leaf
+    for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+        new_root = pickle.loads(pickle.dumps(root, protocol=protocol))
+        assert new_root == root
+        new_leaf = new_root.children[0].children[0]
+        assert new_leaf.label == [60] and new_leaf.parent is new_root.children[0]
+        new_leaf.label = [62]  # the hash cache still works
+        assert new_root != root
+
+
+def test_structural_hash():
+    tim = Timeline([Event(Fraction(i, 4), [60]) for i in [0, 1, 3]], start=0, end=1)
+    rt1 = timeline2rt(tim)
+    rt2 = timeline2rt(tim)
+    rt3 = timeline2rt(Timeline([Event(0, [60]), Event(Fraction(1, 2), [62])]))
+    assert rt1.root is not rt2.root
+    assert rt1.root.structural_hash() == rt2.root.structural_hash()
+    assert rt1 == rt2
+    assert rt1 != rt3
+    assert len({rt1, rt2, rt3}) == 2  # deduplication with a set
+    # the hash is invalidated when the tree is modified
+    leaf = rt2.get_leaf_nodes()[-1]
+    leaf.label = [[61]]
+    assert rt1 != rt2
+    leaf.label = [[60]]
+    assert rt1 == rt2
+    LeafNode(rt2.root.children[0], [[60]])
+    assert rt1 != rt2
+
+
+def test_timeline2rt_intern_table():
+    intern_table = {}
+    tim1 = Timeline([Event(Fraction(i, 4), [60]) for i in range(4)], start=0, end=1)
+    tim2 = Timeline([Event(Fraction(i, 2), [60]) for i in range(4)], start=0, end=2)
+    rt1 = timeline2rt(tim1, intern_table=intern_table)
+    rt2 = timeline2rt(tim2, intern_table=intern_table)
+    assert rt1 == timeline2rt(tim1)
+    assert str(rt1) == str(timeline2rt(tim1))
+    assert len(intern_table) == 3  # a leaf, a pair of leaves, a pair of pairs
+    assert rt1.get_timeline() == tim1
+    # interned nodes cannot be modified
+    with pytest.raises(TypeError):
+        next(iter(intern_table.values())).label = [[61]]
+    # the tree is copied when its nodes are accessed, so they can be modified
+    rt1.get_leaf_nodes()[0].label = [[61]]
+    assert rt1 != rt2
+    assert rt2.get_leaf_nodes()[0].label == [[60]]
+    assert rt1.node_duration(rt1.get_leaf_nodes()[0]) == Fraction(1, 4)
+    # with a weak dictionary, the subtrees that are not used are deleted
+    weak_table = weakref.WeakValueDictionary()
+    timeline2rt(tim1, intern_table=weak_table)
+    assert len(weak_table) == 0
+    rt = timeline2rt(tim1, intern_table=weak_table)
+    assert rt.get_leaves_ticks()[2] == 4
+    assert len(weak_table) == 3  # reading the tree keeps the subtrees shared
+    rt.get_nodes()
+    assert len(weak_table) == 0
+
+
+def test_intern_table_positions():
+    # the four leaves and the two pairs are the same interned node
+    tim = Timeline([Event(Fraction(i, 4), [60]) for i in range(4)], start=0, end=1)
+    intern_table = {}
+    rt = timeline2rt(tim, intern_table=intern_table)
+    assert len(intern_table) == 3
+    index = rt.get_lca_index()
+    assert index is rt.get_lca_index()
+    leaves = rt.get_leaf_nodes()
+    assert len(set(id(leaf) for leaf in leaves)) == 4
+    assert [rt.get_depth(leaf) for leaf in leaves] == [3, 3, 3, 3]
+    assert [index.depth(leaf) for leaf in leaves] == [3, 3, 3, 3]
+    pair1 = rt.root.children[0].children[0]
+    pair2 = rt.root.children[0].children[1]
+    assert rt.get_lca(leaves[0], leaves[1]) is pair1
+    assert index.lca(leaves[0], leaves[1]) is pair1
+    assert index.lca(leaves[2], leaves[3]) is pair2
+    assert index.lca(leaves[1], leaves[2]) is rt.root.children[0]
+    ancestors = [pair2, rt.root.children[0], rt.root]
+    assert [id(a) for a in rt.get_ancestors(leaves[3])] == [id(a) for a in ancestors]
+    assert [rt.node_duration(leaf) for leaf in leaves] == [Fraction(1, 4)] * 4
+    assert rt.get_leaves_counts()[id(pair2)] == 2
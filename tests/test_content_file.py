@@ -0,0 +1,57 @@
+from fractions import Fraction
+import pytest
+import score_model
+from score_model.constant import REST_SYMBOL
+from score_model.music_sequences import Timeline, Event, MusicalContent
+from score_model.content_file import (
+    write_musical_content,
+    read_musical_content,
+    MappedTimelines,
+)
+
+
+def test_content_file(tmp_path):
+    path = tmp_path / "content.bin"
+    tim1 = Timeline(
+        [Event(Fraction(1, 3), [60, 64]), Event(Fraction(1, 2), REST_SYMBOL)],
+        start=0,
+        end=Fraction(7, 2),
+    )
+    tim2 = Timeline([Event(1, [72])], start=1, end=2, backend="columnar")
+    tim3 = Timeline([], start=0, end=1)
+    write_musical_content(MusicalContent([tim1, tim2, tim3]), path)
+    for backend in ["columnar", "object"]:
+        content = read_musical_content(path, backend=backend)
+        assert isinstance(content.timelines, MappedTimelines)
+        assert len(content.timelines) == 3
+        assert content.timelines[2].backend == backend
+        assert list(content.timelines) == [tim1, tim2, tim3]
+        assert content.timelines[-1] == tim3
+
+
+def test_content_file_score(tmp_path):
+    path = tmp_path / "content.bin"
+    timelines = score_model.ScoreModel(
+        "tests/test_musicxml/test_multipart.musicxml"
+    ).get_timelines()
+    write_musical_content(MusicalContent(timelines), path)
+    assert list(read_musical_content(path).timelines) == timelines
+
+
+def test_content_file_invalid(tmp_path):
+    path = tmp_path / "content.bin"
+    with pytest.raises(TypeError):
+        write_musical_content(MusicalContent([Timeline([Event(0, "C1")])]), path)
+    path.write_bytes(b"not a musical content file")
+    with pytest.raises(TypeError):
+        read_musical_content(path)
+    path.write_bytes(b"")
+    with pytest.raises(TypeError):
+        read_musical_content(path)
+    # truncated files
+    write_musical_content(MusicalContent([Timeline([Event(0, [60])])]), path)
+    data = path.read_bytes()
+    for size in [20, 30, len(data) - 8]:  # in the header, in the table, in the block
+        path.write_bytes(data[:size])
+        with pytest.raises(TypeError):
+            read_musical_content(path)
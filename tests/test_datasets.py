@@ -1,6 +1,8 @@
-import music21 as m21
+import os
+import pytest
 from pathlib import Path
 from score_model.m21utils import add_nt_to_score
+from score_model.score_cache import ScoreCache, parse_score
 from colorama import Fore, init
 
 init(autoreset=True)
@@ -15,41 +17,63 @@ init(autoreset=True)
 datasets = {"../qparse-test/gmmt_dataset/musicxml/"}
 
 
-hashtable = {}
+@pytest.fixture(scope="module")
+def cache(request):
+    # the parsed scores are cached between runs, add_nt_to_score reconstructs them
+    cache_dir = os.environ.get("SCORE_MODEL_CACHE")
+    if cache_dir is None:  # the pytest cache directory
+        cache_dir = request.config.cache.mkdir("score_model_cache")
+    return ScoreCache(cache_dir)
 
-for dataset_path in datasets:
-    dataset_name = "/".join(dataset_path.split("/")[4:])
 
-    for xml_file in Path(dataset_path).glob("*.xml"):
-        score = m21.converter.parse(xml_file)
-        try:
-            add_nt_to_score(score)
-        except Exception as error:
-            if str(error) not in hashtable:
-                hashtable[str(error)] = []
-            hashtable[str(error)].append(xml_file)
+def test_datasets(cache):
+    hashtable = {}
 
-# print summary
-print("-------------------------")
-print("SUMMARY")
-print("-------------------------")
+    for dataset_path in datasets:
+        dataset_name = "/".join(dataset_path.split("/")[4:])
 
-if hashtable == {}:
-    print("Congratulations ! There was no error found in this execution.\n")
-else:
-    for key in hashtable.keys():
-        print(
-            Fore.CYAN + key + Fore.RED + " : " + str(len(hashtable[key])) + " errors\n"
-        )
+        for xml_file in Path(dataset_path).glob("*.xml"):
+            try:
+                score = parse_score(xml_file, auto_format=False, cache=cache)
+                add_nt_to_score(score)
+            except Exception as error:
+                if str(error) not in hashtable:
+                    hashtable[str(error)] = []
+                hashtable[str(error)].append(xml_file)
 
+    # print summary
     print("-------------------------")
-    print("ALL ERRORS")
+    print("SUMMARY")
     print("-------------------------")
 
-    # print errors and all the files concerned
-    for key in hashtable.keys():
-        print(Fore.CYAN + "\n-------------------------")
-        print(Fore.CYAN + key + Fore.RED + " : " + str(len(hashtable[key])) + " errors")
-        for value in hashtable[key]:
-            print("     ", value)
+    if hashtable == {}:
+        print("Congratulations ! There was no error found in this execution.\n")
+    else:
+        for key in hashtable.keys():
+            print(
+                Fore.CYAN
+                + key
+                + Fore.RED
+                + " : "
+                + str(len(hashtable[key]))
+                + " errors\n"
+            )
+
+        print("-------------------------")
+        print("ALL ERRORS")
+        print("-------------------------")
+
+        # print errors and all the files concerned
+        for key in hashtable.keys():
+            print(Fore.CYAN + "\n-------------------------")
+            print(
+                Fore.CYAN
+                + key
+                + Fore.RED
+                + " : "
+                + str(len(hashtable[key]))
+                + " errors"
+            )
+            for value in hashtable[key]:
+                print("     ", value)
 
@@ -1,4 +1,5 @@
 import music21 as m21
+import pytest
 from pathlib import Path
 from fractions import Fraction as Fr
 from score_model.m21utils import (
@@ -13,6 +14,8 @@ from score_model.m21utils import (
     get_tuplets,
     correct_tuplet,
     m21_2_notationtree,
+    m21_2_notationtrees,
+    seq_struct2notationtree,
     m21_2_seq_struct,
     nt2seq_structure,
     nt2general_notes,
@@ -21,6 +24,8 @@ from score_model.m21utils import (
     m21_2_rhythmtree,
     reconstruct,
     add_nt_to_score,
+    nt2inter_gn_groupings,
+    nt2over_gn_groupings,
 )
 
 
@@ -591,6 +596,22 @@ def test_reconstruct3():
         )
 
 
+def test_reconstruct_many_loose_notes():
+    measure = m21.stream.Measure(number=1)
+    measure.append([m21.note.Note("C", quarterLength=0.25) for _ in range(2000)])
+    part = m21.stream.Part()
+    part.append(measure)
+    score = m21.stream.Score()
+    score.append(part)
+    reconstruct(score)
+    voices = score.parts[0].getElementsByClass(m21.stream.Measure)[0].getElementsByClass(
+        m21.stream.Voice
+    )
+    assert len(voices) == 1
+    assert len(voices[0].notes) == 2000
+    assert voices[0].notes[-1].offset == Fr(1999, 4)
+
+
 def test_add_nt_to_score1():
     score = m21.converter.parse(
         str(
@@ -628,3 +649,88 @@ def test_continue_start_index():
         score = m21.converter.parse(str(Path(xmlfile)))
         add_nt_to_score(score)
 
+
+def test_nt2gn_groupings():
+    score = m21.converter.parse(str(Path("tests/test_musicxml/test_score1.musicxml")))
+    measures = score.parts[0].getElementsByClass("Measure")
+    for m in measures:
+        gns = m.getElementsByClass("GeneralNote")
+        for tree_type in ["beamings", "tuplets"]:
+            nt = m21_2_notationtree(gns, tree_type)
+            leaves = nt.get_leaf_nodes()
+            assert nt2over_gn_groupings(nt) == [nt.get_depth(n) - 1 for n in leaves]
+            assert nt2inter_gn_groupings(nt) == [
+                nt.get_depth(nt.get_lca(n1, n2)) for n1, n2 in zip(leaves, leaves[1:])
+            ]
+    # beams between the notes of the second measure
+    gns = measures[1].getElementsByClass("GeneralNote")
+    bt = m21_2_notationtree(gns, "beamings")
+    assert nt2inter_gn_groupings(bt) == [0, 1, 0, 0, 2, 2, 2]
+    assert nt2over_gn_groupings(bt) == [0, 1, 1, 0, 2, 2, 2, 2]
+
+
+def test_add_nt_to_score_parallel():
+    path = str(Path("tests/test_musicxml/test_score2.musicxml"))
+    score = add_nt_to_score(m21.converter.parse(path))
+    score_parallel = add_nt_to_score(m21.converter.parse(path), n_workers=2)
+    measures = score.parts[0].getElementsByClass(m21.stream.Measure)
+    measures_parallel = score_parallel.parts[0].getElementsByClass(m21.stream.Measure)
+    for m, mp in zip(measures, measures_parallel):
+        voices = m.getElementsByClass(m21.stream.Voice)
+        voices_parallel = mp.getElementsByClass(m21.stream.Voice)
+        assert len(voices) == len(voices_parallel)
+        for v, vp in zip(voices, voices_parallel):
+            assert v.beaming_tree == vp.beaming_tree
+            assert v.tuplet_tree == vp.tuplet_tree
+
+
+def test_m21_2_notationtrees():
+    score = m21.converter.parse(str(Path("tests/test_musicxml/test_score3.musicxml")))
+    for m in score.parts[0].getElementsByClass("Measure"):
+        gns = list(m.getElementsByClass("GeneralNote"))
+        bt, tt = m21_2_notationtrees(gns)
+        assert bt == m21_2_notationtree(gns, "beamings")
+        assert tt == m21_2_notationtree(gns, "tuplets")
+        assert [l.label for l in bt.get_leaf_nodes()] == [
+            l.label for l in tt.get_leaf_nodes()
+        ]
+
+
+def test_seq_struct2notationtree_deep():
+    labels = [("R", 4, 0, False), ("R", 4, 0, False)]
+    # a group of two 128th notes
+    nt = seq_struct2notationtree(
+        [["start"] * 5, ["stop"] * 5], [[""] * 5, [""] * 5], labels, "beamings"
+    )
+    leaves = nt.get_leaf_nodes()
+    assert len(leaves) == 2
+    assert nt.get_depth(leaves[0]) == 6
+    # a structure deeper than the recursion limit
+    nt = seq_struct2notationtree(
+        [["start"] * 3000, ["stop"] * 3000], [[""] * 3000, [""] * 3000], labels, "beamings"
+    )
+    leaves = nt.get_leaf_nodes()
+    assert len(leaves) == 2
+    assert leaves[0].parent is leaves[1].parent
+    assert nt.get_depth(leaves[0]) == 3001
+    assert nt.get_lca(leaves[0], leaves[1]) is leaves[0].parent
+    assert nt.get_lca_index().depth(leaves[1]) == 3001
+    digest = nt.root.structural_hash()
+    nt.unshare()  # copies the nodes
+    assert nt.root.structural_hash() == digest
+    assert nt.get_depth(nt.get_leaf_nodes()[0]) == 3001
+
+
+def test_seq_struct2notationtree_invalid():
+    labels = [("R", 4, 0, False), ("R", 4, 0, False)]
+    for seq_structure in [
+        [["start"], ["continue"]],  # group not closed
+        [["continue"], ["stop"]],  # group not started
+        [["start"], []],  # note outside of an open group
+        [["start", "start"], ["stop", "continue"]],  # inner group not closed
+        [["partial", "start"], ["stop"]],  # group started under a partial beam
+        [["start"], ["wrong"]],  # invalid type
+    ]:
+        grouping_info = [["" for _ in n] for n in seq_structure]
+        with pytest.raises(TypeError):
+            seq_struct2notationtree(seq_structure, grouping_info, labels, "beamings")
@@ -3,11 +3,16 @@ from score_model.music_sequences import (
     musical_split,
     Event,
     Timeline,
+    TimelineBuilder,
     MusicalContent,
+    ArtifactDictionary,
 )
 from score_model.constant import CONTINUATION_SYMBOL, REST_SYMBOL
 
 import numpy as np
+import io
+import json
+import pickle
 from fractions import Fraction
 
 
@@ -226,6 +231,29 @@ def test_timeline_export_json4():
     assert tim.to_json("duration") == expected_json
 
 
+def test_timeline_write_json():
+    # the JSON written in the buffer is the same as the one of to_json
+    timestamps = [0, Fraction(1, 3), 1]
+    musical_artifacts = [["C1", "C2"], REST_SYMBOL, ["E2"]]
+    events = [Event(t, m) for t, m in zip(timestamps, musical_artifacts)]
+    for backend in ["object", "columnar"]:
+        tim = Timeline(events, start=0, end=2, backend=backend)
+        for time_type in ["onset", "duration"]:
+            buffer = io.BytesIO()
+            tim.write_json(buffer, time_type)
+            assert buffer.getvalue().decode() == json.dumps(tim.to_json(time_type))
+    assert tim.to_json("duration")[1] == {
+        "duration": {"numerator": 2, "denominator": 3},
+        "musical_artifact": REST_SYMBOL,
+    }
+    # float timestamps keep the float arithmetic for the durations
+    tim = Timeline([Event(0, ["C1"]), Event(0.1, ["C2"])], start=0, end=1)
+    assert tim.to_json("duration")[1]["duration"] == {
+        "numerator": Fraction(1 - 0.1).numerator,
+        "denominator": Fraction(1 - 0.1).denominator,
+    }
+
+
 def test_timeline_add():
     # first timeline
     timestamps1 = np.array([0, Fraction(1, 3), 1])
@@ -307,3 +335,161 @@ def test_musical_content():
         ]
     }
     assert mc.to_json("duration") == expected_json
+
+
+def test_columnar_timeline1():
+    events = [Event(0, [60]), Event(Fraction(1, 3), REST_SYMBOL), Event(1, [62, 65])]
+    tim = Timeline(events, start=0, end=2, backend="columnar")
+    assert tim.backend == "columnar"
+    assert tim.get_timestamps() == [0, Fraction(1, 3), 1]
+    assert tim.get_musical_artifacts() == [[60], REST_SYMBOL, [62, 65]]
+    assert tim == Timeline(events, start=0, end=2, backend="columnar")
+    # the initial continuation is added also in the columnar backend
+    tim2 = Timeline([Event(Fraction(1, 2), [60])], start=0, end=1, backend="columnar")
+    assert tim2.get_musical_artifacts() == [CONTINUATION_SYMBOL, [60]]
+    assert np.array_equal(
+        tim2.events, [Event(0, CONTINUATION_SYMBOL), Event(Fraction(1, 2), [60])]
+    )
+
+
+def test_columnar_timeline_operations():
+    # the columnar backend gives the same results of the object backend
+    events1 = [Event(1, [60]), Event(1 + Fraction(1, 3), [62]), Event(Fraction(5, 2), [64])]
+    events2 = [Event(0, [67]), Event(Fraction(1, 2), REST_SYMBOL)]
+    obj1 = Timeline(events1, start=1, end=4)
+    obj2 = Timeline(events2, start=0, end=1)
+    col1 = Timeline(events1, start=1, end=4, backend="columnar")
+    col2 = Timeline(events2, start=0, end=1, backend="columnar")
+    for k in [2, 3, 4]:
+        for normalize in [True, False]:
+            assert obj1.split(k, normalize) == col1.split(k, normalize)
+    assert obj1.shift_and_rescale(6, 8) == col1.shift_and_rescale(6, 8)
+    assert obj1.shift_and_rescale(new_start=0) == col1.shift_and_rescale(new_start=0)
+    assert obj1 + obj2 == col1 + col2
+    assert (col1 + col2).backend == "columnar"
+    assert (col1 + obj2) == (obj1 + obj2)
+    assert col1.to_json("duration") == obj1.to_json("duration")
+
+
+def test_lazy_shift_and_rescale():
+    events = [Event(1, [60]), Event(1 + Fraction(1, 3), [62]), Event(Fraction(5, 2), [64])]
+    tim = Timeline(events, start=1, end=4)
+    tim2 = tim.shift_and_rescale(0, 1).shift_and_rescale(6, 8).shift_and_rescale(new_start=2)
+    # the transforms are composed, the original timeline is not modified
+    assert len(tim2) == 3
+    assert tim == Timeline(events, start=1, end=4)
+    expected_timeline = Timeline(
+        [Event(2, [60]), Event(2 + Fraction(2, 9), [62]), Event(3, [64])], start=2, end=4
+    )
+    assert tim2 == expected_timeline
+    assert tim2.split(2, normalize=True) == expected_timeline.split(2, normalize=True)
+    # the derived timelines do not change when the original events are replaced
+    tim3 = tim.shift_and_rescale(0, 3)
+    tim.events[1] = Event(2, [99])
+    assert tim3 == Timeline(
+        [Event(0, [60]), Event(Fraction(1, 3), [62]), Event(Fraction(3, 2), [64])], 0, 3
+    )
+
+
+def test_timeline_view():
+    events = [Event(1, [60]), Event(1 + Fraction(1, 3), [62]), Event(Fraction(5, 2), [64])]
+    tim = Timeline(events, start=1, end=4)
+    view = tim.view()
+    assert view.to_timeline() == tim
+    for k in [2, 3]:
+        for normalize in [True, False]:
+            subviews = view.split(k, normalize)
+            subtims = tim.split(k, normalize)
+            assert [v.to_timeline() for v in subviews] == subtims
+            for v, t in zip(subviews, subtims):
+                assert [w.to_timeline() for w in v.split(2, normalize)] == t.split(
+                    2, normalize
+                )
+
+
+def test_event_slots():
+    event = Event(Fraction(1, 3), [60, 64])
+    assert not hasattr(event, "__dict__")
+    for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+        assert pickle.loads(pickle.dumps(event, protocol=protocol)) == event
+
+
+def test_artifact_dictionary():
+    dictionary = ArtifactDictionary()
+    codes = dictionary.encode_all([[60, 64], REST_SYMBOL, [60, 64], (60, 64)])
+    assert codes.tolist() == [0, 1, 0, 2]
+    assert len(dictionary) == 3
+    assert dictionary.decode_all(codes) == [[60, 64], REST_SYMBOL, [60, 64], (60, 64)]
+    # the decoded artifacts are copies
+    artifact = dictionary.decode(0)
+    artifact.append(67)
+    assert dictionary.decode_all(codes)[:3] == [[60, 64], REST_SYMBOL, [60, 64]]
+    # only the used artifacts of the other dictionary are translated
+    other = ArtifactDictionary()
+    other.encode_all([[72], [60, 64], [74]])
+    assert dictionary.translate(np.array([1, 1]), other).tolist() == [0, 0]
+    assert len(dictionary) == 3
+    # a columnar timeline gives the same artifacts as an object timeline
+    events = [Event(Fraction(i, 4), [60] if i % 2 == 0 else [62]) for i in range(8)]
+    tim = Timeline(events, start=0, end=2, backend="columnar")
+    assert tim.get_musical_artifacts() == [e.musical_artifact for e in events]
+    tim.events[0].musical_artifact.append(64)
+    assert tim.get_musical_artifacts()[:3] == [[60], [62], [60]]
+    left, right = tim.split(2)
+    assert right.get_musical_artifacts() == [[60], [62], [60], [62]]
+    # timelines with different dictionaries are merged
+    other = Timeline([Event(0, [65]), Event(1, [62])], start=0, end=2, backend="columnar")
+    total = tim + other
+    assert total.get_musical_artifacts()[-2:] == [[65], [62]]
+    assert total == Timeline(list(tim.events) + [Event(2, [65]), Event(3, [62])], 0, 4)
+    assert other != Timeline([Event(0, [65]), Event(1, [60])], 0, 2, backend="columnar")
+    # the views used by timeline2rt compare the codes
+    view1, view2 = tim.view().split(2, normalize=True)
+    assert view1.get_artifact_codes() == view2.get_artifact_codes()
+
+
+def test_timeline_window_queries():
+    events = [Event(Fraction(i, 2), [60 + i]) for i in [0, 1, 3, 6]]
+    for backend in ["object", "columnar"]:
+        tim = Timeline(events, start=0, end=4, backend=backend)
+        # stabbing queries: each event lasts until the next one
+        assert tim.index_at(0) == 0
+        assert tim.index_at(Fraction(1, 2)) == 1
+        assert tim.event_at(Fraction(5, 4)) == Event(Fraction(1, 2), [61])
+        assert tim.event_at(Fraction(7, 2)) == Event(3, [66])
+        assert tim.event_at(4) is None
+        assert tim.event_at(-1) is None
+        # range queries
+        assert tim.window_indices(1, 3) == (1, 3)
+        assert tim.events_in(1, 3) == [Event(Fraction(1, 2), [61]), Event(Fraction(3, 2), [63])]
+        assert tim.events_in(1, 3, overlap=False) == [Event(Fraction(3, 2), [63])]
+        assert tim.events_in(-2, 10) == events
+        assert tim.events_in(2, 2) == []
+        # events that share a timestamp (e.g. grace notes) are all in the window
+        chord = [Event(0, [60]), Event(Fraction(1, 2), [62]), Event(Fraction(1, 2), [64])]
+        tim = Timeline(chord, start=0, end=1, backend=backend)
+        assert tim.events_in(Fraction(1, 2), 1) == chord[1:]
+        assert tim.events_in(Fraction(1, 2), 1, overlap=False) == chord[1:]
+        assert tim.events_in(Fraction(3, 4), 1) == chord[2:]
+    # the sorted timestamps are cached and reset with the events
+    tim = Timeline(events, start=0, end=4)
+    assert tim.index_at(1) == 1
+    tim.events = [Event(0, [60]), Event(2, [62])]
+    assert tim.index_at(1) == 0
+    assert tim.shift_and_rescale(0, 8).event_at(5) == Event(4, [62])
+
+
+def test_timeline_builder():
+    events1 = [Event(1, [60]), Event(1 + Fraction(1, 3), [62]), Event(Fraction(5, 2), [64])]
+    events2 = [Event(0, [67]), Event(Fraction(1, 2), REST_SYMBOL)]
+    for backend in ["object", "columnar"]:
+        tim1 = Timeline(events1, start=1, end=4, backend=backend)
+        tim2 = Timeline(events2, start=0, end=1, backend=backend)
+        builder = TimelineBuilder()
+        builder += tim1
+        builder.append(tim2).append(tim1)
+        assert len(builder) == 3
+        assert builder.end == 8
+        tim = builder.build()
+        assert tim == tim1 + tim2 + tim1
+        assert tim.backend == backend
@@ -0,0 +1,129 @@
+import music21 as m21
+from pathlib import Path
+from fractions import Fraction as Fr
+from score_model.m21utils import (
+    reconstruct,
+    gn2label,
+    m21_2_seq_struct,
+    m21_2_timeline,
+    m21_2_notationtree,
+    voice_descriptors2trees,
+)
+from score_model.musicxml_reader import (
+    read_musicxml,
+    iter_musicxml,
+    xml_gn2label,
+    xml_2_seq_struct,
+    xml_2_timeline,
+    xml_2_notationtree,
+    xml_2_voice_descriptors,
+)
+
+MUSICXML_FILES = sorted(Path("tests/test_musicxml").iterdir())
+
+
+def _m21_voices(path):
+    """Return the nested list [part][measure][voice] of general notes, with the music21 path."""
+    score = m21.converter.parse(str(path))
+    reconstruct(score)
+    return [
+        [
+            [
+                list(v.getElementsByClass(m21.note.GeneralNote))
+                for v in m.getElementsByClass(m21.stream.Voice)
+            ]
+            for m in p.getElementsByClass(m21.stream.Measure)
+        ]
+        for p in score.parts
+    ]
+
+
+def _no_grace(gn_list):
+    return [gn for gn in gn_list if not gn.duration.isGrace]
+
+
+def test_read_musicxml_structure():
+    for path in MUSICXML_FILES:
+        m21_parts = _m21_voices(path)
+        xml_parts = read_musicxml(path)
+        assert len(xml_parts) == len(m21_parts)
+        for m21_part, xml_part in zip(m21_parts, xml_parts):
+            assert len(xml_part) == len(m21_part)
+            for m21_measure, xml_measure in zip(m21_part, xml_part):
+                assert len(xml_measure) == len(m21_measure)
+                for m21_voice, xml_voice in zip(m21_measure, xml_measure):
+                    assert len(xml_voice) == len(m21_voice)
+
+
+def test_xml_gn2label():
+    for path in MUSICXML_FILES:
+        for m21_part, xml_part in zip(_m21_voices(path), read_musicxml(path)):
+            for m21_measure, xml_measure in zip(m21_part, xml_part):
+                for m21_voice, xml_voice in zip(m21_measure, xml_measure):
+                    assert [xml_gn2label(gn) for gn in xml_voice] == [
+                        gn2label(gn) for gn in m21_voice
+                    ]
+
+
+def test_xml_2_seq_struct():
+    for path in MUSICXML_FILES:
+        for m21_part, xml_part in zip(_m21_voices(path), read_musicxml(path)):
+            for m21_measure, xml_measure in zip(m21_part, xml_part):
+                for m21_voice, xml_voice in zip(m21_measure, xml_measure):
+                    xml_voice = [gn for gn in xml_voice if not gn.is_grace]
+                    for struct_type in ["beamings", "tuplets"]:
+                        assert xml_2_seq_struct(
+                            xml_voice, struct_type
+                        ) == m21_2_seq_struct(_no_grace(m21_voice), struct_type)
+
+
+def test_xml_2_notationtree():
+    path = Path("tests/test_musicxml/test_score1.musicxml")
+    for m21_part, xml_part in zip(_m21_voices(path), read_musicxml(path)):
+        for m21_measure, xml_measure in zip(m21_part, xml_part):
+            for m21_voice, xml_voice in zip(m21_measure, xml_measure):
+                for tree_type in ["beamings", "tuplets"]:
+                    assert xml_2_notationtree(
+                        xml_voice, tree_type
+                    ) == m21_2_notationtree(m21_voice, tree_type)
+
+
+def test_xml_2_timeline():
+    # test_score3 has nested tuplets that music21 rounds to the divisions of the file
+    for path in MUSICXML_FILES:
+        if path.name == "test_score3.musicxml":
+            continue
+        for m21_part, xml_part in zip(_m21_voices(path), read_musicxml(path)):
+            for m21_measure, xml_measure in zip(m21_part, xml_part):
+                for m21_voice, xml_voice in zip(m21_measure, xml_measure):
+                    assert xml_2_timeline(xml_voice) == m21_2_timeline(m21_voice)
+
+
+def test_xml_2_timeline_nested_tuplets():
+    xml_part = read_musicxml(Path("tests/test_musicxml/test_score3.musicxml"))[0]
+    tim = xml_2_timeline(xml_part[0][0])
+    assert tim.end == 4
+    assert [e.timestamp for e in tim.events][:5] == [0, Fr(2, 3), Fr(7, 9), Fr(8, 9), 1]
+
+
+def test_iter_musicxml():
+    path = Path("tests/test_musicxml/test_multipart.musicxml")
+    xml_parts = read_musicxml(path)
+    n_measures = 0
+    for part_index, measure_index, voices in iter_musicxml(path):
+        n_measures += 1
+        expected_voices = xml_parts[part_index][measure_index]
+        assert [[xml_gn2label(gn) for gn in v] for v in voices] == [
+            [xml_gn2label(gn) for gn in v] for v in expected_voices
+        ]
+    assert n_measures == sum(len(p) for p in xml_parts)
+
+
+def test_xml_2_voice_descriptors():
+    path = Path("tests/test_musicxml/test_score2.musicxml")
+    for xml_measure in read_musicxml(path)[0]:
+        for xml_voice in xml_measure:
+            bt, tt, rt = voice_descriptors2trees(xml_2_voice_descriptors(xml_voice))
+            assert bt == xml_2_notationtree(xml_voice, "beamings")
+            assert tt == xml_2_notationtree(xml_voice, "tuplets")
+            assert rt.get_timeline(0, 4) == xml_2_timeline(xml_voice)
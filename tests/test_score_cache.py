@@ -0,0 +1,75 @@
+import music21 as m21
+import os
+from pathlib import Path
+import score_model
+from score_model.score_cache import ScoreCache, parse_score
+
+
+def test_score_cache(tmp_path):
+    path = "tests/test_musicxml/test_score2.musicxml"
+    cache = ScoreCache(tmp_path)
+    assert cache.get(path) is None
+    score = parse_score(path, cache=cache)
+    assert cache.size() > 0
+    cached_score = cache.get(path)
+    assert cached_score is not None
+    assert cached_score is not score
+    # the cached score is already reconstructed
+    expected_num_voices = [2, 1, 2, 1]
+    for i, measure in enumerate(
+        cached_score.parts[0].getElementsByClass(m21.stream.Measure)
+    ):
+        assert (
+            len(measure.getElementsByClass(m21.stream.Voice)) == expected_num_voices[i]
+        )
+    # scores not reconstructed are stored separately
+    assert cache.get(path, auto_format=False) is None
+
+
+def test_score_cache_eviction(tmp_path):
+    cache = ScoreCache(tmp_path)
+    parse_score("tests/test_musicxml/test_score1.musicxml", cache=cache)
+    size1 = cache.size()
+    parse_score("tests/test_musicxml/test_score2.musicxml", cache=cache)
+    assert cache.size() > size1
+    # the least recently used score is deleted
+    cache.max_size = cache.size() - 1
+    cache.get("tests/test_musicxml/test_score2.musicxml")
+    cache.evict()
+    assert cache.get("tests/test_musicxml/test_score1.musicxml") is None
+    assert cache.get("tests/test_musicxml/test_score2.musicxml") is not None
+    cache.clear()
+    assert cache.size() == 0
+
+
+def test_score_cache_deleted_entry(tmp_path, monkeypatch):
+    cache = ScoreCache(tmp_path)
+    parse_score("tests/test_musicxml/test_score1.musicxml", cache=cache)
+    size = cache.size()
+    # an entry deleted by another process while the cache is listed
+    (tmp_path / "deleted.p").symlink_to(tmp_path / "missing")
+    assert cache.size() == size
+    cache.max_size = 0
+    cache.evict()
+    assert cache.get("tests/test_musicxml/test_score1.musicxml") is None
+    # an entry deleted by another process while it is read
+    path = "tests/test_musicxml/test_score1.musicxml"
+    cache.max_size = 2 ** 30
+    parse_score(path, cache=cache)
+
+    def deleted(path):
+        raise FileNotFoundError(path)
+
+    monkeypatch.setattr(os, "utime", deleted)
+    assert cache.get(path) is not None
+    monkeypatch.setattr(Path, "unlink", deleted)
+    cache.clear()
+
+
+def test_score_model_cache(tmp_path):
+    cache = ScoreCache(tmp_path)
+    path = "tests/test_musicxml/test_multipart.musicxml"
+    score1 = score_model.ScoreModel(path, cache=cache)
+    score2 = score_model.ScoreModel(path, cache=cache)
+    assert score1.get_timelines() == score2.get_timelines()
+    assert score1.get_timelines_json() == score2.get_timelines_json()
@@ -1,4 +1,6 @@
 import music21 as m21
+import io
+import json
 from pathlib import Path
 import score_model
 
@@ -67,3 +69,58 @@ def test_get_timelines_json():
     }
     assert out_json == expected_json
 
+
+def test_write_timelines_json():
+    for path in [
+        "tests/test_musicxml/test_score1.musicxml",
+        "tests/test_musicxml/test_multipart.musicxml",
+    ]:
+        score = score_model.ScoreModel(path)
+        buffer = io.BytesIO()
+        score.write_timelines_json(buffer)
+        assert buffer.getvalue().decode() == json.dumps(score.get_timelines_json())
+
+
+def test_get_trees():
+    score = score_model.ScoreModel("tests/test_musicxml/test_score2.musicxml")
+    trees = score.get_trees()
+    assert len(trees) == 1
+    assert [len(m) for m in trees[0]] == [2, 1, 2, 1]
+    bt, tt, rt = trees[0][0][0]
+    assert bt.tree_type == "beamings"
+    assert tt.tree_type == "tuplets"
+    assert len(bt.get_leaf_nodes()) == len(tt.get_leaf_nodes())
+    # the trees are the same if they are built in a process pool
+    assert str(score.get_trees(n_workers=2)) == str(trees)
+
+
+def test_produce_trees():
+    score = score_model.ScoreModel(
+        "tests/test_musicxml/test_multipart.musicxml", produce_trees=True
+    )
+    assert len(score.trees) == 2
+    assert str(score.trees) == str(score.get_trees())
+
+
+def test_stream_score():
+    path = "tests/test_musicxml/test_score2.musicxml"
+    stream = list(score_model.stream_score(path, produce_trees=True))
+    assert [(p, m, v) for p, m, v, _, _ in stream] == [
+        (0, 0, 0),
+        (0, 0, 1),
+        (0, 1, 0),
+        (0, 2, 0),
+        (0, 2, 1),
+        (0, 3, 0),
+    ]
+    trees = score_model.fold_trees(stream)
+    assert str(trees) == str(score_model.ScoreModel(path).get_trees())
+
+
+def test_fold_timelines():
+    for path in [
+        "tests/test_musicxml/test_score1.musicxml",
+        "tests/test_musicxml/test_multipart.musicxml",
+    ]:
+        timelines = score_model.fold_timelines(score_model.stream_score(path))
+        assert timelines == score_model.ScoreModel(path).get_timelines()